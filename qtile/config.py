@@ -1,8 +1,27 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import ctypes
+import functools
+import glob
+import hashlib
+import importlib
+import inspect
 import json
+import marshal
+import math
 import os
+import random
+import re
+import shlex
 import socket
-import subprocess
+import struct
+import tarfile
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from array import array
+from collections import deque
 from pathlib import Path
 
 os.environ["PATH"] = os.pathsep.join([
@@ -10,11 +29,272 @@ os.environ["PATH"] = os.pathsep.join([
     os.path.expanduser("~/.local/bin"),
 ])
 
-from libqtile import qtile, layout, bar, widget, hook
+import cairocffi
+from libqtile import qtile, layout, bar
+from libqtile import hook as qtile_hook
+from libqtile import widget as qtile_widgets
 from libqtile.config import Click, Drag, Group, KeyChord, Key, Match, Screen
+from libqtile.images import Img
 from libqtile.lazy import lazy
 from libqtile.log_utils import logger
-from typing import List  # noqa: F401
+from libqtile.utils import create_task
+from libqtile.widget import base as widget_base
+from typing import ClassVar, List  # noqa: F401
+
+
+# ---------- Startup profiler ----------
+# Laps between STARTUP.mark() calls time each section of this file; widget
+# constructors (including qtile's lazy import of each widget module) and startup
+# hooks are timed individually. The sorted report goes to the qtile log once
+# startup completes. libqtile itself is already imported by qtile before this
+# file runs, so the imports above are not worth timing.
+STARTUP_REPORT_FILE = Path.home() / ".cache" / "qtile" / "startup-report.txt"
+
+
+def _atomic_write(path, data):
+    """Replace `path` with `data` (str or bytes) so readers never see half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temporary name: files sharing a stem (the atlas .png and .json)
+    # or one written from two threads must not clobber each other's.
+    tmp = None
+    try:
+        with tempfile.NamedTemporaryFile("wb" if isinstance(data, bytes) else "w",
+                                         dir=path.parent, prefix=f".{path.name}.",
+                                         suffix=".tmp", delete=False) as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+    except BaseException:
+        if tmp is not None:
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+        raise
+
+
+def write_report(path, report):
+    """Log a profiler report and keep a copy in `path` for later reading."""
+    logger.info(report)
+    try:
+        _atomic_write(path, report + "\n")
+    except OSError as err:
+        logger.warning("Could not write %s: %s", path, err)
+
+
+class StartupProfiler:
+    """Time config sections, widget constructors and startup hooks."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self._lap = self.t0
+        self.sections = {}
+        self.widgets = {}
+        self.hooks = {}
+        self.config_time = None
+        self.ready_time = None
+
+    def mark(self, label):
+        """Record the time since the previous mark under `label`."""
+        now = time.perf_counter()
+        self.sections[label] = self.sections.get(label, 0.0) + now - self._lap
+        self._lap = now
+
+    def finish_config(self):
+        self.config_time = time.perf_counter() - self.t0
+
+    def add_widget(self, name, seconds):
+        total, count = self.widgets.get(name, (0.0, 0))
+        self.widgets[name] = (total + seconds, count + 1)
+
+    def timed(self, cls):
+        """Class decorator timing the constructor of a widget class defined here.
+
+        Widgets looked up through `widget` are timed by TimedWidgets; classes
+        built on qtile_widgets directly need this to show up in the report.
+        """
+        profiler = self
+        init = cls.__init__
+
+        @functools.wraps(init)
+        def __init__(obj, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                init(obj, *args, **kwargs)
+            finally:
+                if type(obj) is cls:
+                    profiler.add_widget(cls.__name__, time.perf_counter() - start)
+
+        cls.__init__ = __init__
+        return cls
+
+    def add_hook(self, label, seconds):
+        self.hooks[label] = seconds
+
+    def report(self):
+        def ms(seconds):
+            return f"{seconds * 1000.0:9.1f} ms"
+
+        config_time = ms(self.config_time or 0.0).strip()
+        lines = [f"Startup profile: config loaded in {config_time}"]
+        if self.ready_time is not None:
+            lines[0] += f", startup complete after {ms(self.ready_time).strip()}"
+        lines.append("Config sections:")
+        for label, seconds in sorted(self.sections.items(), key=lambda item: -item[1]):
+            lines.append(f"  {ms(seconds)}  {label}")
+        lines.append("Widget constructors:")
+        widgets = sorted(self.widgets.items(), key=lambda item: -item[1][0])
+        for name, (seconds, count) in widgets:
+            lines.append(f"  {ms(seconds)}  {name} x{count}")
+        lines.append("Startup hooks:")
+        for label, seconds in sorted(self.hooks.items(), key=lambda item: -item[1]):
+            lines.append(f"  {ms(seconds)}  {label}")
+        return "\n".join(lines)
+
+
+class TimedWidgets:
+    """Stand-in for libqtile.widget that times every widget constructor."""
+
+    def __init__(self, module, profiler):
+        self._module = module
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        start = time.perf_counter()
+        cls = getattr(self._module, name)  # libqtile.widget imports lazily
+        if not isinstance(cls, type):
+            return cls
+        profiler = self._profiler
+        profiler.add_widget(f"{name} (import)", time.perf_counter() - start)
+
+        def build(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return cls(*args, **kwargs)
+            finally:
+                profiler.add_widget(name, time.perf_counter() - start)
+
+        setattr(self, name, build)
+        return build
+
+
+STARTUP = StartupProfiler()
+
+
+# ---------- Hook profiler ----------
+# `hook` below is a stand-in for libqtile.hook whose subscribe wraps every
+# handler this file registers. Each call is counted and timed; a synchronous
+# handler over HOOK_BUDGET is logged (at most once a minute per handler),
+# since it stalls the event loop. Async handlers are timed wall-clock,
+# awaits included, and not held to the budget. Startup hooks also feed the
+# startup report.
+HOOK_BUDGET = 0.005
+HOOK_WARN_INTERVAL = 60
+HOOK_STATS_FILE = Path.home() / ".cache" / "qtile" / "hook-stats.txt"
+STARTUP_HOOKS = ("startup", "startup_once", "startup_complete")
+
+
+class HookProfiler:
+    """Call counts and durations per (hook, handler)."""
+
+    def __init__(self, startup, budget=HOOK_BUDGET):
+        self.startup = startup
+        self.budget = budget
+        self.stats = {}     # (hook, handler) -> [calls, total, max, is_async]
+        self._warned = {}
+
+    def wrap(self, hook_name, func):
+        key = (hook_name, func.__name__)
+        is_async = inspect.iscoroutinefunction(func)
+        self.stats.setdefault(key, [0, 0.0, 0.0, is_async])
+
+        if is_async:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._record(key, time.perf_counter() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._record(key, time.perf_counter() - start)
+        return wrapper
+
+    def _record(self, key, seconds):
+        stat = self.stats[key]
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] = max(stat[2], seconds)
+        hook_name, handler = key
+        if hook_name in STARTUP_HOOKS:
+            self.startup.add_hook(f"{hook_name}: {handler}", seconds)
+        if seconds > self.budget and not stat[3]:
+            now = time.monotonic()
+            if now - self._warned.get(key, -HOOK_WARN_INTERVAL) >= HOOK_WARN_INTERVAL:
+                self._warned[key] = now
+                logger.warning("Slow %s hook %s: %.1f ms (budget %.1f ms)",
+                               hook_name, handler, seconds * 1000.0, self.budget * 1000.0)
+
+    def report(self):
+        called = [(key, stat) for key, stat in self.stats.items() if stat[0]]
+        if not called:
+            return "Hook handlers: none called yet"
+        called.sort(key=lambda item: -item[1][1])
+        lines = [f"Hook handlers (budget {self.budget * 1000.0:.1f} ms, by total time):"]
+        for (hook_name, handler), (calls, total, longest, is_async) in called:
+            lines.append(
+                f"  {total * 1000.0:9.1f} ms  {hook_name}: {handler}  x{calls}"
+                f"  mean {total / calls * 1000.0:.2f} ms  max {longest * 1000.0:.1f} ms"
+                + ("  (async)" if is_async else ""))
+        return "\n".join(lines)
+
+
+class ProfiledSubscribe:
+    """Stand-in for hook.subscribe that registers HookProfiler wrappers."""
+
+    def __init__(self, subscribe, profiler):
+        self._subscribe = subscribe
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        register = getattr(self._subscribe, name)
+        if name == "user":
+            def user(hook_name):
+                def decorator(func):
+                    return register(hook_name)(self._profiler.wrap(f"user:{hook_name}", func))
+                return decorator
+            return user
+
+        def decorator(func):
+            return register(self._profiler.wrap(name, func))
+        return decorator
+
+
+class ProfiledHooks:
+    """Stand-in for libqtile.hook; everything but subscribe passes through."""
+
+    def __init__(self, module, profiler):
+        self._module = module
+        self.subscribe = ProfiledSubscribe(module.subscribe, profiler)
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+HOOK_PROFILE = HookProfiler(STARTUP)
+
+
+try:
+    # Palettes from colors.py next to this file; missing when only config.py
+    # was copied over by dtos-original-apply-customizations.sh.
+    import colors as color_themes
+except ImportError:
+    color_themes = None
 
 try:
     # Wayland-only: used to set keyboard layout without setxkbmap
@@ -22,6 +302,10 @@ try:
 except Exception:
     InputConfig = None
 
+widget = TimedWidgets(qtile_widgets, STARTUP)
+hook = ProfiledHooks(qtile_hook, HOOK_PROFILE)
+STARTUP.mark("optional imports (colors.py, wayland backend)")
+
 # ---------- Startup hooks ----------
 
 def is_wayland():
@@ -30,17 +314,965 @@ def is_wayland():
     except Exception:
         return bool(os.environ.get("WAYLAND_DISPLAY"))
 
-# Set keyboard layout on every startup
+
+# reload_config re-imports this file and fires only "startup"; startup_complete
+# comes once per qtile process. Resources that must not outlive their import
+# (file descriptors, X connections) are handed over on the qtile object from a
+# startup hook, not at import time: qtile also imports the config to validate
+# it or before a restart, and those imports must leave the running one alone.
+# Finding a handed-over resource there means this import is a reload.
+CONFIG_RELOADED = hasattr(qtile, "_config_inotify")
+
+
+def after_startup(func):
+    """Subscribe `func` to startup_complete, or to startup when reloading."""
+    if CONFIG_RELOADED:
+        return hook.subscribe.startup(func)
+    return hook.subscribe.startup_complete(func)
+
+
+def hand_over(name, resource):
+    """Make `resource` the live one under `name`, closing the previous import's."""
+    previous = getattr(qtile, name, None)
+    if previous is not None and previous is not resource:
+        previous.close()
+    setattr(qtile, name, resource)
+
+
+# ---------- Keyboard layout ----------
+# On X11 the layout in use is read from the _XKB_RULES_NAMES root property over
+# qtile's own X connection, so restarts skip setxkbmap when nothing changed.
+# Compiling a different keymap still needs setxkbmap, which is exec'd directly.
+# A second X connection listens for PropertyNotify on that property, so layout
+# changes made outside qtile (setxkbmap in a terminal, input-method tools)
+# reach the widget too. Wayland keeps using InputConfig through wl_input_rules.
+KB_LAYOUT = "gb"
+
+
+class KeyboardLayoutManager:
+    """Apply KB_LAYOUT only when needed and push changes to listeners."""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.listeners = []
+        self._conn = None
+        self._atom = None
+
+    def current(self):
+        """Layout(s) the X server is using, e.g. "gb" or "us,gb"; None if unknown."""
+        try:
+            conn = qtile.core.conn
+            reply = conn.conn.core.GetProperty(
+                False,
+                conn.default_screen.root.wid,
+                conn.atoms["_XKB_RULES_NAMES"],
+                conn.atoms["STRING"],
+                0,
+                1024,
+            ).reply()
+            # rules, model, layout, variant, options; NUL separated
+            fields = reply.value.buf().split(b"\0")
+            return fields[2].decode() if len(fields) > 2 else None
+        except Exception:
+            return None
+
+    def apply(self):
+        if is_wayland():
+            return
+        if self.current() == self.layout:
+            return
+        create_task(self._set_layout())
+
+    async def _set_layout(self):
+        try:
+            proc = await asyncio.create_subprocess_exec("setxkbmap", self.layout)
+            await proc.wait()
+        except OSError as err:
+            logger.warning("Could not set keyboard layout: %s", err)
+            return
+        if self._conn is None:
+            self.notify()  # no watcher to see the change
+
+    def notify(self):
+        for callback in list(self.listeners):
+            callback()
+
+    def watch(self):
+        """Notify listeners whenever anything rewrites _XKB_RULES_NAMES (X11)."""
+        if is_wayland() or self._conn is not None:
+            return
+        try:
+            import xcffib
+            import xcffib.xproto
+
+            conn = xcffib.connect()
+            root = conn.get_setup().roots[conn.pref_screen].root
+            name = "_XKB_RULES_NAMES"
+            self._atom = conn.core.InternAtom(False, len(name), name).reply().atom
+            conn.core.ChangeWindowAttributesChecked(
+                root, xcffib.xproto.CW.EventMask,
+                [xcffib.xproto.EventMask.PropertyChange]).check()
+        except Exception as err:
+            logger.warning("Keyboard layout watch unavailable: %s", err)
+            return
+        self._conn = conn
+        self._property_notify = xcffib.xproto.PropertyNotifyEvent
+        asyncio.get_event_loop().add_reader(conn.get_file_descriptor(), self._on_x_events)
+
+    def _on_x_events(self):
+        changed = False
+        try:
+            while (event := self._conn.poll_for_event()) is not None:
+                if isinstance(event, self._property_notify) and event.atom == self._atom:
+                    changed = True
+        except Exception as err:
+            logger.warning("Keyboard layout watch stopped: %s", err)
+            self.close()
+        if changed:
+            self.notify()
+
+    def close(self):
+        if self._conn is not None:
+            asyncio.get_event_loop().remove_reader(self._conn.get_file_descriptor())
+            self._conn.disconnect()
+            self._conn = None
+
+
+KEYBOARD = KeyboardLayoutManager(KB_LAYOUT)
+
+
+# Set keyboard layout on every startup (skipped when already active)
 @hook.subscribe.startup
 def startup():
-    if not is_wayland():
-        os.system("setxkbmap gb")
+    KEYBOARD.apply()
+    # After a reload the previous manager still watches for the old widgets.
+    hand_over("_config_keyboard", KEYBOARD)
+    KEYBOARD.watch()
+
+
+@hook.subscribe.shutdown
+def stop_keyboard_watch():
+    KEYBOARD.close()
+
+
+# ---------- Autostart services ----------
+# Session daemons are launched directly (no /bin/sh) and in parallel; a service
+# only waits for the services listed in its `after`. Daemons marked `restart`
+# are supervised and relaunched with a backoff when they crash.
+AUTOSTART_SCRIPT = Path.home() / ".config" / "qtile" / "autostart.sh"
+WALL_QTILE_CACHE = Path.home() / ".cache" / "wall_qtile"
+WALL_GENERIC_CACHE = Path.home() / ".cache" / "wall"
+WALL_DIR = Path("/usr/share/backgrounds/dtos-backgrounds")
+SERVICE_READY_TIMEOUT = 10
+SERVICE_MAX_RESTARTS = 5
+
+
+class Service:
+    """A process to launch at login.
+
+    argv may be a callable returning the argument list (or None to skip).
+    ready is an optional callable polled until it returns True; without it a
+    service counts as ready once spawned (daemons) or exited (oneshots).
+    """
+
+    def __init__(self, name, argv, after=(), ready=None, restart=False,
+                 oneshot=False, when=None):
+        self.name = name
+        self.argv = argv
+        self.after = after
+        self.ready = ready
+        self.restart = restart
+        self.oneshot = oneshot
+        self.when = when
+
+
+class AutostartManager:
+    """Launch services in dependency order, supervise them, record latency."""
+
+    def __init__(self, services):
+        self.services = {svc.name: svc for svc in services}
+        self.latency = {}
+        self.procs = {}
+        self._ready = {}
+        self._tasks = []
+
+    def start(self):
+        self._ready = {name: asyncio.Event() for name in self.services}
+        self._tasks = [create_task(self._run(svc)) for svc in self.services.values()]
+        create_task(self._report())
+
+    async def _report(self):
+        await asyncio.gather(*(event.wait() for event in self._ready.values()))
+        summary = ", ".join(
+            f"{name} {seconds * 1000.0:.0f} ms"
+            for name, seconds in sorted(self.latency.items(), key=lambda item: -item[1])
+        )
+        logger.info("Autostart ready: %s", summary or "nothing launched")
+
+    async def wait_ready(self, name):
+        """Wait until service `name` is ready, skipped or has failed."""
+        if name in self._ready:
+            await self._ready[name].wait()
+
+    async def _run(self, svc):
+        try:
+            for dep in svc.after:
+                if dep in self._ready:
+                    await self._ready[dep].wait()
+            if svc.when is not None and not svc.when():
+                return
+            argv = svc.argv() if callable(svc.argv) else svc.argv
+            if not argv:
+                return
+            await self._launch(svc, argv)
+        except Exception:
+            logger.exception("Autostart service %s failed", svc.name)
+        finally:
+            # Never leave dependents waiting on a service that failed.
+            self._ready[svc.name].set()
+
+    async def _spawn(self, argv):
+        return await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+    async def _launch(self, svc, argv):
+        start = time.monotonic()
+        try:
+            proc = await self._spawn(argv)
+        except OSError as err:
+            logger.warning("Autostart %s: cannot run %s: %s", svc.name, argv[0], err)
+            return
+        self.procs[svc.name] = proc
+
+        if svc.oneshot:
+            await proc.wait()
+        if svc.ready is not None:
+            deadline = start + SERVICE_READY_TIMEOUT
+            while not svc.ready() and time.monotonic() < deadline:
+                if proc.returncode is not None and not svc.oneshot:
+                    break
+                await asyncio.sleep(0.05)
+        self.latency[svc.name] = time.monotonic() - start
+        self._ready[svc.name].set()
+
+        if svc.restart and not svc.oneshot:
+            await self._supervise(svc, argv, proc)
+
+    async def _supervise(self, svc, argv, proc):
+        restarts = 0
+        while True:
+            code = await proc.wait()
+            if restarts >= SERVICE_MAX_RESTARTS:
+                logger.warning("Autostart %s exited (%s); giving up after %d restarts",
+                               svc.name, code, restarts)
+                return
+            restarts += 1
+            delay = min(2 ** restarts, 60)
+            logger.warning("Autostart %s exited (%s); restarting in %ds",
+                           svc.name, code, delay)
+            await asyncio.sleep(delay)
+            try:
+                proc = await self._spawn(argv)
+            except OSError as err:
+                logger.warning("Autostart %s: restart failed: %s", svc.name, err)
+                return
+            self.procs[svc.name] = proc
+
+
+def x_selection_owned(atom_name):
+    """Readiness check: an X client owns the selection (e.g. _NET_WM_CM_S0)."""
+    def check():
+        try:
+            conn = qtile.core.conn
+            reply = conn.conn.core.GetSelectionOwner(conn.atoms[atom_name]).reply()
+            return reply.owner != 0
+        except Exception:
+            return True  # can't tell; don't hold dependents back
+    return check
+
+
+def user_autostart_argv():
+    """Extra commands users add to autostart.sh still run, once, at login."""
+    if os.access(AUTOSTART_SCRIPT, os.X_OK):
+        return [str(AUTOSTART_SCRIPT)]
+    return None
+
+
+# ---------- Emacs ----------
+# The Emacs daemon starts with the other login services. Frames and --eval
+# forms go straight to its server socket using the emacsclient wire protocol,
+# so a key press costs one local socket write instead of a shell, an
+# emacsclient process and, before the daemon is up, a cold Emacs start.
+EMACS_WARMUP_FORM = "(ignore-errors (require 'dired) (require 'ibuffer) (require 'eshell))"
+EMACS_REPLY_TIMEOUT = 5
+
+
+def emacs_quote(arg):
+    """Quote one argument the way emacsclient does (server-quote-arg)."""
+    arg = arg.replace("&", "&&").replace(" ", "&_").replace("\n", "&n")
+    return "&" + arg if arg.startswith("-") else arg
+
+
+_EMACS_UNQUOTE = {"&": "&", "-": "-", "n": "\n"}
+
+
+def emacs_unquote(arg):
+    """Undo server-quote-arg in one pass, as server-unquote-arg does."""
+    return re.sub(r"&(.)", lambda m: _EMACS_UNQUOTE.get(m.group(1), " "), arg, flags=re.DOTALL)
+
+
+class EmacsServer:
+    """Client side of the Emacs server socket."""
+
+    def socket_path(self):
+        """The daemon's socket, as emacsclient finds it, or None if absent."""
+        name = os.environ.get("EMACS_SOCKET_NAME", "server")
+        if os.path.isabs(name):
+            candidates = [name]
+        else:
+            candidates = []
+            runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+            if runtime_dir:
+                candidates.append(os.path.join(runtime_dir, "emacs", name))
+            candidates.append(f"/tmp/emacs{os.getuid()}/{name}")
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def running(self):
+        """A daemon is accepting connections (a stale socket file doesn't count)."""
+        path = self.socket_path()
+        if path is None:
+            return False
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.2)
+            try:
+                sock.connect(path)
+            except OSError:
+                return False
+        return True
+
+    async def send(self, commands):
+        """Send one request line and log any -error replies; OSError if no daemon."""
+        path = self.socket_path()
+        if path is None:
+            raise FileNotFoundError("no Emacs server socket")
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            writer.write((" ".join(commands) + "\n").encode())
+            await writer.drain()
+            while True:
+                line = await asyncio.wait_for(reader.readline(), EMACS_REPLY_TIMEOUT)
+                if not line:
+                    break
+                if line.startswith(b"-error "):
+                    logger.warning("Emacs: %s", emacs_unquote(line[7:].decode().strip()))
+        except TimeoutError:
+            pass  # frames opened with -nowait outlive the connection
+        finally:
+            writer.close()
+
+    def open_frame(self, *forms):
+        """New graphical frame, optionally evaluating `forms` in it."""
+        display = os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY", "")
+        commands = ["-dir", emacs_quote(str(Path.home()) + "/"), "-nowait",
+                    "-display", emacs_quote(display), "-window-system"]
+        for form in forms:
+            commands += ["-eval", emacs_quote(form)]
+        create_task(self._open_frame(commands, forms))
+
+    async def _open_frame(self, commands, forms):
+        try:
+            await self.send(commands)
+        except OSError:
+            # Daemon not up (yet): emacsclient starts one with -a "".
+            argv = ["emacsclient", "-c", "-n", "-a", ""]
+            for form in forms:
+                argv += ["--eval", form]
+            qtile.spawn(argv)
+
+    async def warm_up(self):
+        """Preload the packages the Emacs chord uses once the daemon is ready."""
+        await AUTOSTART.wait_ready("emacs")
+        if self.running():
+            try:
+                await self.send(["-eval", emacs_quote(EMACS_WARMUP_FORM)])
+            except OSError as err:
+                logger.warning("Emacs warm-up failed: %s", err)
+
+
+EMACS = EmacsServer()
+
+
+def emacs_frame(*forms):
+    def _inner(qtile):
+        EMACS.open_frame(*forms)
+
+    return _inner
+
+
+AUTOSTART_SERVICES = [
+    Service(
+        "picom",
+        ["picom", "--config", str(Path.home() / ".config" / "picom" / "picom.conf")],
+        ready=x_selection_owned("_NET_WM_CM_S0"),
+        restart=True,
+        when=lambda: not is_wayland(),
+    ),
+    Service("dunst", ["dunst"], restart=True),
+    Service("autostart.sh", user_autostart_argv, after=("dunst",), oneshot=True),
+    # --daemon exits once init.el has loaded, so "ready" means warm.
+    Service("emacs", ["emacs", "--daemon"], after=("picom", "dunst"), oneshot=True,
+            when=lambda: not EMACS.running()),
+]
+
+AUTOSTART = AutostartManager(AUTOSTART_SERVICES)
+
 
-# Run autostart script once (your dtos autostart.sh)
 @hook.subscribe.startup_once
 def start_once():
-    home = os.path.expanduser("~")
-    subprocess.call([os.path.join(home, ".config", "qtile", "autostart.sh")])
+    AUTOSTART.start()
+    create_task(EMACS.warm_up())
+    restore = wallpaper_to_restore()
+    if restore:
+        create_task(apply_wallpaper(restore, remember=False))
+
+
+# ---------- Wallpaper ----------
+# Wallpapers are painted by qtile itself on every screen. Each source image is
+# scaled (fill) to each screen's size once and kept as a PNG keyed by path,
+# mtime and geometry, so later sets and login restores skip the JPEG decode
+# and rescale of the full-size DTOS backgrounds. Writing a new PNG drops the
+# source's PNGs from older mtimes and trims the directory to the
+# WALLPAPER_CACHE_MAX most recently used files (hits refresh the file mtime).
+WALLPAPER_CACHE_DIR = Path.home() / ".cache" / "qtile" / "wallpapers"
+WALLPAPER_CACHE_MAX = 24
+
+
+def wallpaper_to_restore():
+    """Last wallpaper from the per-WM cache, else a random DTOS background."""
+    for cache in (WALL_QTILE_CACHE, WALL_GENERIC_CACHE):
+        try:
+            lines = cache.read_text().split("\n")
+        except OSError:
+            continue
+        if lines[0].strip():
+            return lines[0].strip()
+    return WALLPAPERS.random_pick()
+
+
+def scaled_wallpaper(path, width, height):
+    """Path to `path` cropped and scaled to width x height, built on a cache miss."""
+    stat = os.stat(path)
+    source = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    target = WALLPAPER_CACHE_DIR / f"{source}-{stat.st_mtime_ns}-{width}x{height}.png"
+    try:
+        os.utime(target)
+        return target
+    except FileNotFoundError:
+        pass
+
+    img = Img.from_path(path)
+    scale = max(width / img.width, height / img.height)
+    surface = cairocffi.ImageSurface(cairocffi.FORMAT_RGB24, width, height)
+    ctx = cairocffi.Context(surface)
+    ctx.translate((width - img.width * scale) / 2, (height - img.height * scale) / 2)
+    ctx.scale(scale, scale)
+    ctx.set_source_surface(img.surface)
+    ctx.get_source().set_filter(cairocffi.FILTER_GOOD)
+    ctx.paint()
+
+    _atomic_write(target, surface.write_to_png())
+    prune_wallpaper_cache(target, f"{source}-{stat.st_mtime_ns}-")
+    return target
+
+
+def prune_wallpaper_cache(keep, current_prefix):
+    """Drop stale versions of keep's source, then all but the newest files."""
+    source_prefix = current_prefix.split("-", 1)[0] + "-"
+    files = []
+    for entry in os.scandir(WALLPAPER_CACHE_DIR):
+        if not entry.name.endswith(".png") or entry.path == str(keep):
+            continue
+        try:
+            if entry.name.startswith(source_prefix) and not entry.name.startswith(current_prefix):
+                os.unlink(entry.path)
+            else:
+                files.append((entry.stat().st_mtime, entry.path))
+        except OSError:
+            continue
+    files.sort(reverse=True)
+    for _mtime, stale in files[WALLPAPER_CACHE_MAX - 1:]:
+        try:
+            os.unlink(stale)
+        except OSError:
+            pass
+
+
+CURRENT_WALLPAPER = {"path": None}
+
+
+async def apply_wallpaper(path, remember=True, recolor=False):
+    """Paint `path` on every screen; scaling runs off the event loop.
+
+    With recolor, the bar and borders switch to the image's indexed palette.
+    """
+    loop = asyncio.get_running_loop()
+    sizes = {(scr.width, scr.height) for scr in qtile.screens}
+    scaled = {}
+    for width, height in sizes:
+        try:
+            scaled[(width, height)] = await loop.run_in_executor(
+                None, scaled_wallpaper, path, width, height)
+        except Exception as err:
+            logger.warning("Could not prepare wallpaper %s: %s", path, err)
+            return
+
+    for scr in qtile.screens:
+        scr.set_wallpaper(str(scaled[(scr.width, scr.height)]), "stretch")
+    CURRENT_WALLPAPER["path"] = path
+    if recolor:
+        WALLPAPERS.apply_colors(path)
+
+    if remember:
+        try:
+            WALL_QTILE_CACHE.write_text(path + "\n")
+        except OSError as err:
+            logger.warning("Could not remember wallpaper: %s", err)
+
+
+# dm-setbg: qtile cmd-obj -o cmd -f fire_user_hook -a set_wallpaper -a /path/img.jpg
+# Add "-a recolor" to switch the bar colors to the wallpaper's palette too.
+@hook.subscribe.user("set_wallpaper")
+def set_wallpaper_command(path, recolor=""):
+    create_task(apply_wallpaper(path, recolor=recolor == "recolor"))
+
+
+# Random pick from the index. "match" limits it to wallpapers with the focused
+# screen's aspect ratio; "recolor" as above.
+@hook.subscribe.user("random_wallpaper")
+def random_wallpaper_command(*flags):
+    aspect = None
+    if "match" in flags:
+        aspect = qtile.current_screen.width / qtile.current_screen.height
+    path = WALLPAPERS.random_pick(aspect=aspect)
+    if path:
+        create_task(apply_wallpaper(path, recolor="recolor" in flags))
+
+
+@hook.subscribe.screens_reconfigured
+def repaint_wallpaper_after_hotplug():
+    if CURRENT_WALLPAPER["path"]:
+        create_task(apply_wallpaper(CURRENT_WALLPAPER["path"], remember=False))
+
+
+# ---------- Wallpaper index ----------
+# Size, aspect ratio and a 10-color palette for every image in WALL_DIR, kept
+# on disk and updated incrementally by mtime. Random picks, aspect filters and
+# "wallpaper plus matching colors" are lookups instead of find/shuf/pywal runs.
+WALLPAPER_INDEX_FILE = Path.home() / ".cache" / "qtile" / "wallpaper-index.json"
+WALLPAPER_EXTENSIONS = (".jpg", ".jpeg", ".png")
+PALETTE_SAMPLE_WIDTH = 64
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def extract_palette(surface):
+    """Ten hex colors in config slot order from a small RGB24 cairo surface.
+
+    Pixels are bucketed to 4 bits per channel; the ten most common buckets give
+    the colors. Darkest two become the backgrounds, the lightest the
+    foreground and the rest the accents, ordered by hue.
+    """
+    surface.flush()
+    height, stride = surface.get_height(), surface.get_stride()
+    width = surface.get_width()
+    pixels = np.frombuffer(surface.get_data(), dtype=np.uint8)
+    pixels = pixels.reshape(height, stride)[:, :width * 4].reshape(-1, 4)
+    blue, green, red = (pixels[:, i].astype(np.int64) for i in range(3))
+
+    codes = (red >> 4) << 8 | (green >> 4) << 4 | (blue >> 4)
+    counts = np.bincount(codes, minlength=4096)
+    top = np.argsort(counts)[::-1][:10]
+    top = top[counts[top] > 0]
+    means = np.stack([
+        np.bincount(codes, weights=channel, minlength=4096)[top] / counts[top]
+        for channel in (red, green, blue)
+    ], axis=1)
+    while len(means) < 10:
+        means = np.vstack([means, means[: 10 - len(means)]])
+
+    luma = means @ np.array([0.2126, 0.7152, 0.0722])
+    order = np.argsort(luma)
+    dark, light, accents = order[:2], order[-1], order[2:-1]
+    maxc, minc = means.max(axis=1), means.min(axis=1)
+    delta = np.where(maxc > minc, maxc - minc, 1.0)
+    r, g, b = means[:, 0], means[:, 1], means[:, 2]
+    hue = np.select(
+        [maxc == r, maxc == g],
+        [((g - b) / delta) % 6, (b - r) / delta + 2],
+        (r - g) / delta + 4,
+    )
+    accents = accents[np.argsort(hue[accents])]
+
+    def hexcolor(index):
+        return "#{:02x}{:02x}{:02x}".format(*(int(v) for v in means[index]))
+
+    return [hexcolor(i) for i in (dark[0], dark[1], light, *accents)]
+
+
+def describe_wallpaper(path):
+    """Index entry for one image: size, aspect ratio and palette (needs NumPy)."""
+    img = Img.from_path(path)
+    width, height = int(img.width), int(img.height)
+    entry = {"width": width, "height": height, "aspect": width / height, "palette": None}
+    if np is not None:
+        sample_h = max(1, round(PALETTE_SAMPLE_WIDTH * height / width))
+        surface = cairocffi.ImageSurface(cairocffi.FORMAT_RGB24,
+                                         PALETTE_SAMPLE_WIDTH, sample_h)
+        ctx = cairocffi.Context(surface)
+        ctx.scale(PALETTE_SAMPLE_WIDTH / width, sample_h / height)
+        ctx.set_source_surface(img.surface)
+        ctx.paint()
+        entry["palette"] = extract_palette(surface)
+    return entry
+
+
+class WallpaperIndex:
+    """Persistent metadata for WALL_DIR, refreshed incrementally by mtime."""
+
+    def __init__(self, directory=WALL_DIR, index_file=WALLPAPER_INDEX_FILE):
+        self.directory = directory
+        self.index_file = index_file
+        self.entries = {}
+        self._task = None
+        try:
+            with index_file.open() as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as err:
+            logger.warning("Rebuilding unreadable wallpaper index: %s", err)
+
+    def refresh(self):
+        """Re-index changed files in the background; returns the running task."""
+        if self._task is None or self._task.done():
+            self._task = create_task(self._refresh())
+        return self._task
+
+    async def _refresh(self):
+        loop = asyncio.get_running_loop()
+        entries = await loop.run_in_executor(None, self._scan)
+        if entries != self.entries:
+            self.entries = entries
+            await loop.run_in_executor(None, self._save)
+
+    def _scan(self):
+        entries = {}
+        try:
+            files = [e for e in os.scandir(self.directory)
+                     if e.is_file() and e.name.lower().endswith(WALLPAPER_EXTENSIONS)]
+        except OSError as err:
+            logger.warning("Wallpaper directory unavailable: %s", err)
+            return self.entries
+        for entry in files:
+            try:
+                mtime = entry.stat().st_mtime_ns
+            except OSError:
+                continue  # removed or renamed since the listing
+            old = self.entries.get(entry.path)
+            if old is not None and old["mtime"] == mtime:
+                entries[entry.path] = old
+                continue
+            try:
+                entries[entry.path] = dict(describe_wallpaper(entry.path), mtime=mtime)
+            except Exception as err:
+                logger.warning("Skipping wallpaper %s: %s", entry.path, err)
+        return entries
+
+    def _save(self):
+        try:
+            _atomic_write(self.index_file, json.dumps(self.entries))
+        except OSError as err:
+            logger.warning("Could not write wallpaper index: %s", err)
+
+    def matching(self, aspect, tolerance=0.05):
+        """Paths whose aspect ratio is within `tolerance` of `aspect`."""
+        return [path for path, entry in self.entries.items()
+                if abs(entry["aspect"] - aspect) <= tolerance]
+
+    def random_pick(self, aspect=None):
+        choices = list(self.entries) if aspect is None else self.matching(aspect)
+        if not choices and not self.entries:
+            # No index yet (first login): fall back to a directory listing.
+            try:
+                choices = [e.path for e in os.scandir(self.directory)
+                           if e.is_file() and e.name.lower().endswith(WALLPAPER_EXTENSIONS)]
+            except OSError:
+                return None
+        return random.choice(choices) if choices else None
+
+    def apply_colors(self, path):
+        """Write the image's palette as pywal colors.json and repaint with it."""
+        entry = self.entries.get(path)
+        if entry is None or entry.get("palette") is None:
+            logger.warning("No indexed palette for %s", path)
+            return
+        palette = entry["palette"]
+        accents = [palette[1], *palette[3:10]]
+        wal = {
+            "wallpaper": path,
+            "special": {"background": palette[0], "foreground": palette[2],
+                        "cursor": palette[2]},
+            "colors": {f"color{i}": accents[i % 8] for i in range(16)},
+        }
+        try:
+            _atomic_write(WAL_COLORS_FILE, json.dumps(wal, indent=4))
+        except OSError as err:
+            logger.warning("Could not write %s: %s", WAL_COLORS_FILE, err)
+        if INOTIFY.fd is None:
+            # No watcher to pick the new colors.json up; repaint directly.
+            apply_palette(load_wal_colors())
+
+
+WALLPAPERS = WallpaperIndex()
+
+
+@after_startup
+def refresh_wallpaper_index():
+    WALLPAPERS.refresh().add_done_callback(lambda _: PICKER.prepare())
+
+
+# ---------- Wallpaper picker ----------
+# Every wallpaper is a cell in one thumbnail atlas kept on disk next to the
+# index. The atlas is rebuilt in the background when the index changes, copying
+# unchanged cells from the old one, so opening the picker only blits from a
+# surface already in memory. SUPER + p then b opens it; arrows or hjkl move,
+# Return applies, Shift+Return applies with the wallpaper's colors, Escape
+# closes.
+ATLAS_FILE = Path.home() / ".cache" / "qtile" / "wallpaper-atlas.png"
+ATLAS_META_FILE = ATLAS_FILE.with_suffix(".json")
+THUMB_WIDTH, THUMB_HEIGHT = 192, 108
+ATLAS_COLUMNS = 6
+PICKER_ROWS = 4
+PICKER_GAP = 6
+
+
+def _atlas_cell(index):
+    return (index % ATLAS_COLUMNS) * THUMB_WIDTH, (index // ATLAS_COLUMNS) * THUMB_HEIGHT
+
+
+def _read_atlas_meta():
+    try:
+        with ATLAS_META_FILE.open() as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("cell") != [THUMB_WIDTH, THUMB_HEIGHT] or meta.get("columns") != ATLAS_COLUMNS:
+        return None
+    return meta
+
+
+def build_atlas(entries):
+    """Atlas surface and path order for the indexed wallpapers `entries`.
+
+    Runs in an executor. Cells whose file is unchanged since the last atlas are
+    copied across; only new or modified images are decoded and scaled.
+    """
+    paths = sorted(entries)
+    wanted = {path: entries[path]["mtime"] for path in paths}
+    meta = _read_atlas_meta()
+    old_slots = meta["slots"] if meta else {}
+    old_surface = None
+    if meta:
+        if {p: s[1] for p, s in old_slots.items()} == wanted and meta["paths"] == paths:
+            try:
+                return cairocffi.ImageSurface.create_from_png(str(ATLAS_FILE)), paths
+            except Exception as err:
+                logger.warning("Rebuilding unreadable wallpaper atlas: %s", err)
+                old_slots = {}
+        else:
+            try:
+                old_surface = cairocffi.ImageSurface.create_from_png(str(ATLAS_FILE))
+            except Exception:
+                old_slots = {}
+
+    rows = max(1, -(-len(paths) // ATLAS_COLUMNS))
+    surface = cairocffi.ImageSurface(cairocffi.FORMAT_RGB24,
+                                     ATLAS_COLUMNS * THUMB_WIDTH, rows * THUMB_HEIGHT)
+    ctx = cairocffi.Context(surface)
+    slots = {}
+    for index, path in enumerate(paths):
+        x, y = _atlas_cell(index)
+        ctx.save()
+        ctx.rectangle(x, y, THUMB_WIDTH, THUMB_HEIGHT)
+        ctx.clip()
+        old = old_slots.get(path)
+        if old_surface is not None and old is not None and old[1] == wanted[path]:
+            old_x, old_y = _atlas_cell(old[0])
+            ctx.set_source_surface(old_surface, x - old_x, y - old_y)
+            ctx.paint()
+        else:
+            try:
+                img = Img.from_path(path)
+            except Exception as err:
+                logger.warning("No thumbnail for %s: %s", path, err)
+                ctx.restore()
+                continue
+            scale = max(THUMB_WIDTH / img.width, THUMB_HEIGHT / img.height)
+            ctx.translate(x + (THUMB_WIDTH - img.width * scale) / 2,
+                          y + (THUMB_HEIGHT - img.height * scale) / 2)
+            ctx.scale(scale, scale)
+            ctx.set_source_surface(img.surface)
+            ctx.paint()
+        ctx.restore()
+        slots[path] = [index, wanted[path]]
+    surface.flush()
+
+    try:
+        _atomic_write(ATLAS_FILE, surface.write_to_png())
+        _atomic_write(ATLAS_META_FILE, json.dumps({
+            "cell": [THUMB_WIDTH, THUMB_HEIGHT], "columns": ATLAS_COLUMNS,
+            "paths": paths, "slots": slots,
+        }))
+    except OSError as err:
+        logger.warning("Could not write wallpaper atlas: %s", err)
+    return surface, paths
+
+
+class WallpaperPicker:
+    """Thumbnail grid in a qtile popup, driven by the "wallpaper" key chord."""
+
+    def __init__(self):
+        self.atlas = None
+        self.paths = []
+        self.selected = 0
+        self.top_row = 0
+        self.popup = None
+        self._task = None
+
+    def prepare(self):
+        """Load or rebuild the atlas in the background."""
+        if self._task is None or self._task.done():
+            self._task = create_task(self._prepare())
+        return self._task
+
+    async def _prepare(self):
+        loop = asyncio.get_running_loop()
+        entries = dict(WALLPAPERS.entries)
+        self.atlas, self.paths = await loop.run_in_executor(None, build_atlas, entries)
+        self.selected = min(self.selected, max(0, len(self.paths) - 1))
+
+    def open(self):
+        from libqtile.popup import Popup
+
+        if self.atlas is None or not self.paths:
+            logger.info("Wallpaper thumbnails are still being built")
+            self.prepare()
+            qtile.ungrab_all_chords()  # nothing to drive the picker keys yet
+            return
+        self.close()
+        if CURRENT_WALLPAPER["path"] in self.paths:
+            self.selected = self.paths.index(CURRENT_WALLPAPER["path"])
+        rows = min(PICKER_ROWS, -(-len(self.paths) // ATLAS_COLUMNS))
+        width = ATLAS_COLUMNS * (THUMB_WIDTH + PICKER_GAP) + PICKER_GAP
+        height = rows * (THUMB_HEIGHT + PICKER_GAP) + PICKER_GAP
+        scr = qtile.current_screen
+        self.popup = Popup(
+            qtile,
+            x=scr.x + max(0, (scr.width - width) // 2),
+            y=scr.y + max(0, (scr.height - height) // 2),
+            width=width, height=height,
+            background=colors[0][0], border=colors[8][0], border_width=2,
+        )
+        self.top_row = 0
+        self._scroll_to_selection(rows)
+        self.draw()
+        self.popup.place()
+        self.popup.unhide()
+
+    def close(self):
+        if self.popup is not None:
+            self.popup.kill()
+            self.popup = None
+
+    def _visible_rows(self):
+        return (self.popup.height - PICKER_GAP) // (THUMB_HEIGHT + PICKER_GAP)
+
+    def _scroll_to_selection(self, rows):
+        row = self.selected // ATLAS_COLUMNS
+        if row < self.top_row:
+            self.top_row = row
+        elif row >= self.top_row + rows:
+            self.top_row = row - rows + 1
+
+    def draw(self):
+        self.popup.clear(self.popup.background)
+        ctx = self.popup.drawer.ctx
+        rows = self._visible_rows()
+        first = self.top_row * ATLAS_COLUMNS
+        for index in range(first, min(len(self.paths), first + rows * ATLAS_COLUMNS)):
+            col, row = index % ATLAS_COLUMNS, index // ATLAS_COLUMNS - self.top_row
+            x = PICKER_GAP + col * (THUMB_WIDTH + PICKER_GAP)
+            y = PICKER_GAP + row * (THUMB_HEIGHT + PICKER_GAP)
+            atlas_x, atlas_y = _atlas_cell(index)
+            ctx.save()
+            ctx.rectangle(x, y, THUMB_WIDTH, THUMB_HEIGHT)
+            ctx.clip()
+            ctx.set_source_surface(self.atlas, x - atlas_x, y - atlas_y)
+            ctx.paint()
+            ctx.restore()
+            if index == self.selected:
+                ctx.set_source_rgb(*(int(colors[3][0][i:i + 2], 16) / 255 for i in (1, 3, 5)))
+                ctx.set_line_width(3)
+                ctx.rectangle(x - 1.5, y - 1.5, THUMB_WIDTH + 3, THUMB_HEIGHT + 3)
+                ctx.stroke()
+        self.popup.draw()
+
+    def move(self, dx, dy):
+        if self.popup is None:
+            return
+        target = self.selected + dx + dy * ATLAS_COLUMNS
+        if 0 <= target < len(self.paths):
+            self.selected = target
+            self._scroll_to_selection(self._visible_rows())
+            self.draw()
+
+    def choose(self, recolor=False):
+        if self.popup is not None and self.paths:
+            create_task(apply_wallpaper(self.paths[self.selected], recolor=recolor))
+        self.close()
+
+
+PICKER = WallpaperPicker()
+
+
+def picker_move(qtile, dx, dy):
+    PICKER.move(dx, dy)
+
+
+def picker_choose(qtile, recolor=False):
+    PICKER.choose(recolor)
+
+
+@hook.subscribe.enter_chord
+def open_wallpaper_picker(name):
+    if name == "wallpaper":
+        PICKER.open()
+
+
+@hook.subscribe.leave_chord
+def close_wallpaper_picker():
+    PICKER.close()
 
 
 # ---------- Basic settings ----------
@@ -60,7 +1292,7 @@ myChat = "whatsapp-for-linux"
 # Wayland input rules (ignored on X11). Keeps keyboard layout in sync without setxkbmap.
 wl_input_rules = {}
 if InputConfig is not None:
-    wl_input_rules = {"type:keyboard": InputConfig(kb_layout="gb")}
+    wl_input_rules = {"type:keyboard": InputConfig(kb_layout=KB_LAYOUT)}
 
 # Toggle Wayland tray (StatusNotifier). Enabled now that dbus-fast is installed.
 ENABLE_STATUS_NOTIFIER = True
@@ -68,30 +1300,44 @@ ENABLE_STATUS_NOTIFIER = True
 
 # ---------- Helper window move functions ----------
 
+def _shift_window(qtile, step):
+    win = qtile.current_window
+    if win is None or win.group is None:
+        return
+    target = TOPOLOGY.neighbour(win.group.name, step)
+    if target is not None:
+        win.togroup(target)
+
+
 def window_to_prev_group(qtile):
-    if qtile.currentWindow is not None:
-        i = qtile.groups.index(qtile.currentGroup)
-        qtile.currentWindow.togroup(qtile.groups[i - 1].name)
+    """Move the focused window to the previous group on its own screen (wraps)."""
+    _shift_window(qtile, -1)
 
 
 def window_to_next_group(qtile):
-    if qtile.currentWindow is not None:
-        i = qtile.groups.index(qtile.currentGroup)
-        qtile.currentWindow.togroup(qtile.groups[i + 1].name)
+    """Move the focused window to the next group on its own screen (wraps)."""
+    _shift_window(qtile, 1)
+
+
+def _window_to_screen(qtile, step):
+    """Move the focused window to the same workspace (e.g. DEV) on another screen."""
+    win = qtile.current_window
+    if win is None or win.group is None or len(qtile.screens) < 2:
+        return
+    target_screen = (qtile.current_screen.index + step) % len(qtile.screens)
+    target = TOPOLOGY.on_screen(win.group.name, target_screen)
+    if target is None:
+        return
+    win.togroup(target)
+    qtile.groups_map[target].toscreen(target_screen)
 
 
 def window_to_previous_screen(qtile):
-    i = qtile.screens.index(qtile.current_screen)
-    if i != 0:
-        group = qtile.screens[i - 1].group.name
-        qtile.current_window.togroup(group)
+    _window_to_screen(qtile, -1)
 
 
 def window_to_next_screen(qtile):
-    i = qtile.screens.index(qtile.current_screen)
-    if i + 1 != len(qtile.screens):
-        group = qtile.screens[i + 1].group.name
-        qtile.current_window.togroup(group)
+    _window_to_screen(qtile, 1)
 
 
 def switch_screens(qtile):
@@ -100,67 +1346,534 @@ def switch_screens(qtile):
     qtile.current_screen.set_group(group)
 
 
-def total_updates_count():
-    """Count repo updates (pacman/Pamac) plus AUR updates (yay/paru)."""
-    def _count(cmd):
+# ---------- Update count helpers ----------
+# Repo and AUR probes run concurrently on qtile's event loop and only one check
+# runs at a time. The last result is cached on disk so a restart shows the
+# previous count straight away instead of waiting for the probes.
+# The count is recomputed when pacman's local or sync database changes (an
+# install, upgrade or -Sy from anywhere) and when the upgrade terminal opened
+# from the widget exits; the long interval only catches new AUR releases.
+# A db.lck older than PACMAN_STALE_LOCK is taken to be left over from a pacman
+# that was killed, and no longer holds the recount back.
+UPDATES_CACHE_FILE = Path.home() / ".cache" / "qtile" / "updates.json"
+UPDATES_INTERVAL = 6 * 3600
+UPDATES_PROBE_TIMEOUT = 300
+PACMAN_DB_DIR = Path("/var/lib/pacman")
+PACMAN_LOCAL_DB = PACMAN_DB_DIR / "local"
+PACMAN_SYNC_DB = PACMAN_DB_DIR / "sync"
+PACMAN_LOCK_FILE = PACMAN_DB_DIR / "db.lck"
+PACMAN_SETTLE_DELAY = 5
+PACMAN_STALE_LOCK = 30 * 60
+
+# Each probe runs the first command that exists. Success is read from its
+# output: package lines are a count whatever the exit status, and an error
+# message on stderr with no package lines (offline, db lock held) is a failed
+# probe, not zero updates. Exit statuses are only a hint, since qtile's SIGCHLD
+# handler can reap the child first and leave asyncio with 255. The expected
+# ones are listed per command: checkupdates exits 2 for "no updates", pamac 100
+# for "updates found".
+PROBE_ERROR_PREFIXES = ("==> ERROR", "error:", "Error:")
+REPO_PROBES = (
+    (["checkupdates"], (0, 2)),
+    (["pamac", "checkupdates", "--no-aur", "--quiet"], (0, 100)),
+)
+
+
+def _count_package_lines(output):
+    count = 0
+    for line in output.splitlines():
+        stripped = line.strip()
+        # Only count lines that look like package entries, skip pacman candy art.
+        if stripped and stripped[0].isalnum():
+            count += 1
+    return count
+
+
+async def _run_probe(commands, timeout=UPDATES_PROBE_TIMEOUT):
+    """Count package lines from the first available command; None if none ran or it failed."""
+    for cmd, ok_codes in commands:
         try:
-            result = subprocess.run(
-                cmd,
-                check=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.DEVNULL,
-                text=True,
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
             )
+        except OSError:
+            continue
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except TimeoutError:
+            proc.kill()
+            await proc.wait()
+            logger.warning("Update probe timed out: %s", cmd[0])
+            return None
+        count = _count_package_lines(stdout.decode(errors="replace"))
+        if count:
+            return count
+        errors = [line.strip() for line in stderr.decode(errors="replace").splitlines()
+                  if line.lstrip().startswith(PROBE_ERROR_PREFIXES)]
+        if errors:
+            logger.warning("Update probe %s failed: %s", cmd[0], errors[0])
+            return None
+        if proc.returncode not in ok_codes:
+            logger.debug("Update probe %s exited %s without output; taking it as no updates",
+                         cmd[0], proc.returncode)
+        return 0
+    return None
+
+
+# ---------- AUR checker ----------
+# Foreign packages (installed but in no sync repo) come straight from pacman's
+# databases. Their AUR versions are fetched with batched RPC v5 info queries
+# and cached on disk for AUR_CACHE_TTL. When the AUR can't be reached the
+# cached versions are used as they are, and the network is left alone for
+# AUR_OFFLINE_RETRY, so a flaky link never stalls a count. The transport is a
+# plain callable(url, timeout) -> bytes; pass another one (or point rpc_url at
+# a local HTTP stub) to test without the real AUR.
+AUR_RPC_URL = "https://aur.archlinux.org/rpc/"
+AUR_CACHE_FILE = Path.home() / ".cache" / "qtile" / "aur-versions.json"
+AUR_CACHE_TTL = 6 * 3600
+AUR_OFFLINE_RETRY = 600
+AUR_RPC_TIMEOUT = 10
+AUR_BATCH_SIZE = 100
+
+
+def _split_package_dir(dirname):
+    """("name", "epoch:ver-rel") from a pacman database entry name."""
+    name, version, release = dirname.rsplit("-", 2)
+    return name, f"{version}-{release}"
+
+
+def _rpmvercmp(a, b):
+    """Compare two version segments the way pacman's rpmvercmp does."""
+    if a == b:
+        return 0
+    i = j = 0
+    len_a, len_b = len(a), len(b)
+    while i < len_a and j < len_b:
+        start_a, start_b = i, j
+        while i < len_a and not a[i].isalnum():
+            i += 1
+        while j < len_b and not b[j].isalnum():
+            j += 1
+        if i >= len_a or j >= len_b:
+            break
+        # Different separator lengths decide it.
+        if i - start_a != j - start_b:
+            return -1 if i - start_a < j - start_b else 1
+        start_a, start_b = i, j
+        is_num = a[i].isdigit()
+        same_kind = str.isdigit if is_num else str.isalpha
+        while i < len_a and same_kind(a[i]):
+            i += 1
+        while j < len_b and same_kind(b[j]):
+            j += 1
+        seg_a, seg_b = a[start_a:i], b[start_b:j]
+        if not seg_b:
+            # Numeric segments are newer than alphabetic ones.
+            return 1 if is_num else -1
+        if is_num:
+            seg_a, seg_b = seg_a.lstrip("0"), seg_b.lstrip("0")
+            if len(seg_a) != len(seg_b):
+                return 1 if len(seg_a) > len(seg_b) else -1
+        if seg_a != seg_b:
+            return -1 if seg_a < seg_b else 1
+    if i >= len_a and j >= len_b:
+        return 0
+    # A leftover alphabetic part (1.0rc1 vs 1.0) is older; anything else newer.
+    if (i >= len_a and not (j < len_b and b[j].isalpha())) or (i < len_a and a[i].isalpha()):
+        return -1
+    return 1
+
+
+def _parse_evr(version):
+    epoch, colon, rest = version.partition(":")
+    if not colon or not epoch.isdigit():
+        epoch, rest = "0", version
+    ver, dash, rel = rest.rpartition("-")
+    if not dash:
+        return epoch, rest, None
+    return epoch, ver, rel
+
+
+def vercmp(a, b):
+    """pacman's vercmp: <0 if a is older than b, 0 if equal, >0 if newer."""
+    if a == b:
+        return 0
+    epoch_a, ver_a, rel_a = _parse_evr(a)
+    epoch_b, ver_b, rel_b = _parse_evr(b)
+    result = _rpmvercmp(epoch_a, epoch_b) or _rpmvercmp(ver_a, ver_b)
+    if result == 0 and rel_a is not None and rel_b is not None:
+        result = _rpmvercmp(rel_a, rel_b)
+    return result
+
+
+def urllib_transport(url, timeout):
+    request = urllib.request.Request(url, headers={"User-Agent": "dtos-qtile-config"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+class AurChecker:
+    """Count foreign packages with a newer AUR version; works offline from cache."""
+
+    def __init__(self, transport=urllib_transport, rpc_url=AUR_RPC_URL,
+                 cache_file=AUR_CACHE_FILE, ttl=AUR_CACHE_TTL):
+        self.transport = transport
+        self.rpc_url = rpc_url
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.versions = {}      # name -> [AUR version or None, fetched at]
+        self.offline = False
+        self._offline_since = 0.0
+        self._sync_names = {}   # sync db path -> (mtime_ns, package names)
+        try:
+            with cache_file.open() as f:
+                self.versions = json.load(f)
         except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as err:
+            logger.warning("Ignoring unreadable AUR cache: %s", err)
+
+    def _repo_names(self):
+        names = set()
+        for db in sorted(PACMAN_SYNC_DB.glob("*.db")):
+            mtime = db.stat().st_mtime_ns
+            cached = self._sync_names.get(db)
+            if cached is None or cached[0] != mtime:
+                try:
+                    with tarfile.open(db) as tar:
+                        members = {n.split("/", 1)[0] for n in tar.getnames()}
+                    names_in_db = {_split_package_dir(m)[0] for m in members if m.count("-") >= 2}
+                    cached = (mtime, names_in_db)
+                except (OSError, tarfile.TarError) as err:
+                    logger.warning("Cannot read sync database %s: %s", db, err)
+                    continue
+                self._sync_names[db] = cached
+            names |= cached[1]
+        return names
+
+    def foreign_packages(self):
+        """{name: installed version} for packages no sync repo provides."""
+        repo = self._repo_names()
+        installed = dict(_split_package_dir(entry.name)
+                         for entry in os.scandir(PACMAN_LOCAL_DB)
+                         if entry.is_dir() and entry.name.count("-") >= 2)
+        return {name: version for name, version in installed.items() if name not in repo}
+
+    def fetch(self, names):
+        """AUR versions for `names`, one RPC info query per batch."""
+        found = {}
+        for start in range(0, len(names), AUR_BATCH_SIZE):
+            query = urllib.parse.urlencode(
+                [("v", "5"), ("type", "info")]
+                + [("arg[]", name) for name in names[start:start + AUR_BATCH_SIZE]])
+            reply = json.loads(self.transport(f"{self.rpc_url}?{query}", AUR_RPC_TIMEOUT))
+            if reply.get("type") == "error":
+                raise ValueError(reply.get("error", "AUR RPC error"))
+            for result in reply.get("results", ()):
+                found[result["Name"]] = result["Version"]
+        return found
+
+    def _save(self):
+        try:
+            _atomic_write(self.cache_file, json.dumps(self.versions))
+        except OSError as err:
+            logger.warning("Could not write AUR cache: %s", err)
+
+    async def count(self):
+        """Outdated AUR packages, or None if offline with nothing cached."""
+        loop = asyncio.get_running_loop()
+        try:
+            foreign = await loop.run_in_executor(None, self.foreign_packages)
+        except OSError as err:
+            logger.warning("Cannot list foreign packages: %s", err)
             return None
-        lines = []
-        for line in result.stdout.splitlines():
-            stripped = line.strip()
-            # Only count lines that look like package entries, skip pacman candy art.
-            if not stripped or not stripped[0].isalnum():
-                continue
-            lines.append(stripped)
-        return len(lines)
 
-    repo = _count(["checkupdates"])
-    if repo is None:
-        repo = _count(["pamac", "checkupdates", "--no-aur", "--quiet"])
-    repo = repo or 0
+        now = time.time()
+        stale = sorted(name for name in foreign
+                       if now - self.versions.get(name, (None, 0.0))[1] >= self.ttl)
+        if stale and not (self.offline and now - self._offline_since < AUR_OFFLINE_RETRY):
+            try:
+                found = await loop.run_in_executor(None, self.fetch, stale)
+            except (OSError, ValueError, KeyError) as err:
+                if not self.offline:
+                    logger.warning("AUR unreachable, using cached versions: %s", err)
+                self.offline = True
+                self._offline_since = now
+            else:
+                self.offline = False
+                # Packages missing from the AUR are cached too, so they
+                # aren't asked about again until the TTL runs out.
+                self.versions = {name: entry for name, entry in self.versions.items()
+                                 if name in foreign}
+                for name in stale:
+                    self.versions[name] = [found.get(name), now]
+                await loop.run_in_executor(None, self._save)
+
+        known = [(self.versions[name][0], version) for name, version in foreign.items()
+                 if name in self.versions]
+        if self.offline and foreign and not known:
+            return None
+        return sum(1 for aur, local in known if aur is not None and vercmp(aur, local) > 0)
+
 
-    aur = _count(["yay", "-Qua"])
-    if aur is None:
-        aur = _count(["paru", "-Qua"])
-    aur = aur or 0
+AUR = AurChecker()
 
-    return str(repo + aur)
+
+class UpdateChecker:
+    """Single-flight update counter with the last result cached on disk."""
+
+    def __init__(self, cache_file=UPDATES_CACHE_FILE, max_age=UPDATES_INTERVAL):
+        self.cache_file = cache_file
+        self.max_age = max_age
+        self.count = None
+        self.timestamp = 0.0
+        self.listeners = []
+        self._task = None
+        self._dirty = False
+        self._settle_timer = None
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with self.cache_file.open() as f:
+                data = json.load(f)
+            self.count = int(data["count"])
+            self.timestamp = float(data["timestamp"])
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            logger.warning("Ignoring unreadable update cache: %s", err)
+
+    def _save_cache(self):
+        try:
+            _atomic_write(self.cache_file,
+                          json.dumps({"count": self.count, "timestamp": self.timestamp}))
+        except OSError as err:
+            logger.warning("Could not write update cache: %s", err)
+
+    def is_stale(self):
+        return self.count is None or time.time() - self.timestamp >= self.max_age
+
+    def text(self):
+        return "..." if self.count is None else str(self.count)
+
+    def refresh(self):
+        """Start a check unless one is already running; return the running task."""
+        if self._task is None or self._task.done():
+            self._task = create_task(self._check())
+        return self._task
+
+    async def _check(self):
+        # Run again if the package databases changed while probing, since
+        # that count may predate the change.
+        while True:
+            self._dirty = False
+            await self._check_once()
+            if not self._dirty:
+                return
+
+    async def _check_once(self):
+        repo, aur = await asyncio.gather(
+            _run_probe(REPO_PROBES),
+            AUR.count(),
+        )
+        if repo is None or aur is None:
+            # A failed source would count as zero: keep showing (and caching)
+            # the previous count until a check gets both.
+            failed = " and ".join(name for name, result in (("repo", repo), ("AUR", aur))
+                                  if result is None)
+            logger.warning("%s update probe failed; keeping cached count", failed)
+            return
+        self.count = repo + aur
+        self.timestamp = time.time()
+        self._save_cache()
+        text = self.text()
+        for callback in self.listeners:
+            callback(text)
+
+    def poll(self):
+        """GenPollText entry point: returns the cached count, never blocks."""
+        if self.is_stale():
+            qtile.call_soon_threadsafe(self.refresh)
+        return self.text()
+
+    def invalidate(self):
+        self.timestamp = 0.0
+        if self._task is not None and not self._task.done():
+            self._dirty = True
+        else:
+            self.refresh()
+
+    def watch_pacman(self):
+        for directory in (PACMAN_LOCAL_DB, PACMAN_SYNC_DB):
+            try:
+                INOTIFY.watch(directory, IN_CREATE | IN_DELETE | IN_MOVED_FROM
+                              | IN_MOVED_TO | IN_CLOSE_WRITE, self._on_db_change)
+            except OSError as err:
+                logger.warning("Cannot watch %s for package changes: %s", directory, err)
+
+    def _on_db_change(self, _name, _mask):
+        # A transaction touches many files; wait for it to go quiet.
+        if self._settle_timer is not None:
+            self._settle_timer.cancel()
+        self._settle_timer = qtile.call_later(PACMAN_SETTLE_DELAY, self._db_settled)
+
+    def _db_settled(self):
+        self._settle_timer = None
+        try:
+            lock_age = time.time() - PACMAN_LOCK_FILE.stat().st_mtime
+        except OSError:
+            lock_age = None  # no lock: the transaction is over
+        if lock_age is not None:
+            if lock_age < PACMAN_STALE_LOCK:
+                # pacman is still running (e.g. waiting at a prompt).
+                self._settle_timer = qtile.call_later(PACMAN_SETTLE_DELAY, self._db_settled)
+                return
+            logger.warning("Ignoring stale %s (%d min old)", PACMAN_LOCK_FILE, lock_age // 60)
+        self.invalidate()
+
+    def run_upgrade(self):
+        """Open the upgrade terminal and recount as soon as it closes."""
+        create_task(self._run_upgrade())
+
+    async def _run_upgrade(self):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                myTerm, "-e", "yay", "-Syu",
+                stdin=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as err:
+            logger.warning("Cannot start upgrade terminal: %s", err)
+            return
+        await proc.wait()
+        if self._settle_timer is not None:
+            # The upgrade's own database writes; recounting now covers them.
+            self._settle_timer.cancel()
+            self._settle_timer = None
+        self.invalidate()
+
+
+UPDATES = UpdateChecker()
+
+
+@after_startup
+def watch_pacman_db():
+    UPDATES.watch_pacman()
 
 
 # ---------- Network widget helpers ----------
 # The stock widget.Net throws when a listed interface disappears (common in VMs),
-# then stops polling. Read totals ourselves and format safely.
-NET_STATE = {"ts": None, "rx": None, "tx": None}
-NET_DEV_PATH = Path("/proc/net/dev")
+# then stops polling. Read counters ourselves and format safely.
+# Only physical NICs are summed: bridge, veth and tun traffic is already counted
+# on the physical interface it leaves through.
+NET_DEV_PATH = "/proc/net/dev"
+SYS_CLASS_NET = Path("/sys/class/net")
 
 
-def _read_net_totals(skip=("lo",)):
-    rx = tx = 0
+def _is_physical_interface(name):
+    """Virtual interfaces (lo, bridges, veth, tun/tap) live under devices/virtual."""
     try:
-        with NET_DEV_PATH.open() as f:
-            for line in f:
-                if ":" not in line:
-                    continue
-                name, data = map(str.strip, line.split(":", 1))
-                if name in skip:
-                    continue
-                fields = data.split()
-                if len(fields) < 9:
-                    continue
-                rx += int(fields[0])
-                tx += int(fields[8])
-    except Exception as err:
-        logger.warning("Net stats read failed: %s", err)
-        return None
-    return rx, tx
+        target = os.readlink(SYS_CLASS_NET / name)
+    except OSError:
+        return False
+    return "/devices/virtual/" not in target
+
+
+class NetSampler:
+    """Per-interface rx/tx rates from one persistent /proc/net/dev descriptor."""
+
+    def __init__(self, path=NET_DEV_PATH, bufsize=8192):
+        self.path = path
+        self.bufsize = bufsize
+        self.names = []
+        self.physical = []
+        self.rx = array("Q")
+        self.tx = array("Q")
+        self.rx_rate = array("d")
+        self.tx_rate = array("d")
+        self.rx_total = 0.0
+        self.tx_total = 0.0
+        self.ready = False
+        self._fd = None
+        self._ts = None
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _read(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+        data = os.pread(self._fd, self.bufsize, 0)
+        while len(data) >= self.bufsize:
+            # Lots of veth pairs; grow once and keep the larger buffer.
+            self.bufsize *= 2
+            data = os.pread(self._fd, self.bufsize, 0)
+        return data
+
+    def _reset(self, names):
+        """Interface set changed: resize the arrays and classify the new names."""
+        self.names = names
+        self.physical = [_is_physical_interface(n.decode()) for n in names]
+        if not any(self.physical):
+            # Containers and odd VMs: fall back to everything except loopback.
+            self.physical = [n != b"lo" for n in names]
+        count = len(names)
+        self.rx = array("Q", bytes(8 * count))
+        self.tx = array("Q", bytes(8 * count))
+        self.rx_rate = array("d", bytes(8 * count))
+        self.tx_rate = array("d", bytes(8 * count))
+        self.ready = False
+
+    def sample(self):
+        """Re-read the counters and update per-interface and aggregate rates."""
+        now = time.monotonic()
+        lines = self._read().split(b"\n")[2:]
+        names = [line.partition(b":")[0].strip() for line in lines if b":" in line]
+        if names != self.names:
+            self._reset(names)
+            self._ts = None
+
+        delta_t = max(now - self._ts, 1e-6) if self._ts is not None else None
+        rx_total = tx_total = 0.0
+        index = 0
+        for line in lines:
+            _, sep, data = line.partition(b":")
+            if not sep:
+                continue
+            fields = data.split()
+            rx, tx = int(fields[0]), int(fields[8])
+            if delta_t is not None:
+                # A counter going backwards means the interface was reset.
+                rx_rate = max(rx - self.rx[index], 0) / delta_t
+                tx_rate = max(tx - self.tx[index], 0) / delta_t
+                self.rx_rate[index] = rx_rate
+                self.tx_rate[index] = tx_rate
+                if self.physical[index]:
+                    rx_total += rx_rate
+                    tx_total += tx_rate
+            self.rx[index] = rx
+            self.tx[index] = tx
+            index += 1
+
+        self.ready = delta_t is not None
+        self.rx_total = rx_total
+        self.tx_total = tx_total
+        self._ts = now
+
+    def interface_rates(self):
+        """Map interface name to (rx, tx) bytes per second from the last sample."""
+        return {
+            name.decode(): (self.rx_rate[i], self.tx_rate[i])
+            for i, name in enumerate(self.names)
+        }
+
+
+NET = NetSampler()
 
 
 def _human_rate(bytes_per_sec):
@@ -173,41 +1886,752 @@ def _human_rate(bytes_per_sec):
         rate /= 1024.0
 
 
-def net_status():
-    now = time.monotonic()
-    totals = _read_net_totals()
-    if totals is None:
+def net_status(sample, interface=None):
+    """Aggregate physical-NIC rates, or a single interface when one is named."""
+    if not sample["net_ok"]:
         return "Net: --"
-
-    rx, tx = totals
-    last_ts = NET_STATE["ts"]
-    last_rx = NET_STATE["rx"]
-    last_tx = NET_STATE["tx"]
-    NET_STATE.update(ts=now, rx=rx, tx=tx)
-
-    if last_ts is None or last_rx is None or last_tx is None:
+    if not NET.ready:
         return "Net: init"
 
-    delta_t = max(now - last_ts, 1e-6)
-    down_rate = (rx - last_rx) / delta_t
-    up_rate = (tx - last_tx) / delta_t
+    if interface is None:
+        down_rate, up_rate = NET.rx_total, NET.tx_total
+    else:
+        down_rate, up_rate = NET.interface_rates().get(interface, (0.0, 0.0))
     return f"Net: {_human_rate(down_rate)} ↓↑ {_human_rate(up_rate)}"
 
+
+# ---------- Shared system sampler ----------
+# Every bar used to run its own net/memory polls, and the net widgets shared
+# NetSampler state, so each measured half the real interval. One timer now
+# reads everything once per tick and pushes the same sample to every screen.
+SAMPLE_INTERVAL = 2
+
+
+class ProcReader:
+    """Keep a /proc or /sys file open and re-read it from offset 0."""
+
+    def __init__(self, path, bufsize=4096):
+        self.path = path
+        self.bufsize = bufsize
+        self._fd = None
+
+    def read(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            return os.pread(self._fd, self.bufsize, 0)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# ---------- Temperature sampler ----------
+# Sensor paths are discovered once and kept open; every tick is one pread per
+# sensor. All sensors are read and shown per label; the headline reading uses
+# only the CPU chips when there are any. acpitz is a board/ACPI zone, not a CPU
+# sensor, so it only heads the readings on machines without one.
+HWMON_DIR = Path("/sys/class/hwmon")
+THERMAL_ZONES_GLOB = "/sys/class/thermal/thermal_zone*/temp"
+CPU_HWMON_CHIPS = ("coretemp", "k10temp", "zenpower", "cpu_thermal")
+
+
+class TempSampler:
+    """Cached hwmon temp*_input readers with max and per-sensor readings."""
+
+    def __init__(self):
+        self.sensors, self.headline = self._discover()
+        self.readings = {}
+
+    @staticmethod
+    def _discover():
+        """All sensors by "chip/label", and the labels the headline uses."""
+        cpu, other = {}, {}
+        for chip in sorted(HWMON_DIR.glob("hwmon*")):
+            try:
+                name = (chip / "name").read_text().strip()
+            except OSError:
+                continue
+            for path in sorted(chip.glob("temp*_input")):
+                label_path = path.with_name(path.name.replace("_input", "_label"))
+                try:
+                    label = f"{name}/{label_path.read_text().strip()}"
+                except OSError:
+                    label = f"{name}/{path.name[:-len('_input')]}"
+                target = cpu if name in CPU_HWMON_CHIPS else other
+                target[label] = ProcReader(str(path), bufsize=32)
+        if cpu or other:
+            return {**cpu, **other}, set(cpu or other)
+        # No hwmon driver loaded: fall back to ACPI thermal zones.
+        zones = {
+            Path(path).parent.name: ProcReader(path, bufsize=32)
+            for path in sorted(glob.glob(THERMAL_ZONES_GLOB))
+        }
+        return zones, set(zones)
+
+    def sample(self):
+        """Read every sensor; return the hottest headline (CPU) sensor in °C, or None."""
+        readings = {}
+        for label, reader in self.sensors.items():
+            try:
+                readings[label] = int(reader.read()) / 1000.0
+            except (OSError, ValueError):
+                continue
+        self.readings = readings
+        return max((value for label, value in readings.items() if label in self.headline),
+                   default=None)
+
+
+THERMAL = TempSampler()
+
+
+class SystemSampler:
+    """Read net, memory, CPU and thermal data once per tick for all widgets."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.subscribers = []
+        self.sample = None
+        self._timer = None
+        self._meminfo = ProcReader("/proc/meminfo")
+        self._stat = ProcReader("/proc/stat", bufsize=512)
+        self._cpu_last = None
+
+    def subscribe(self, target):
+        self.subscribers.append(target)
+        if self._timer is None:
+            self._tick()
+        elif self.sample is not None:
+            target.push(self.sample)
+
+    def unsubscribe(self, target):
+        if target in self.subscribers:
+            self.subscribers.remove(target)
+        if not self.subscribers and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _tick(self):
+        self._timer = POLLER.call_later(self.interval, self._tick)
+        self.sample = self.read()
+        for target in list(self.subscribers):
+            target.push(self.sample)
+
+    def read(self):
+        sample = {
+            "net_ok": True,
+            "mem_used": None,
+            "mem_total": None,
+            "cpu": None,
+            "temp": None,
+            "temps": {},
+        }
+        try:
+            NET.sample()
+        except (OSError, ValueError, IndexError) as err:
+            logger.warning("Net stats read failed: %s", err)
+            NET.close()
+            sample["net_ok"] = False
+        try:
+            sample.update(self._read_memory())
+            sample["cpu"] = self._read_cpu()
+        except (OSError, ValueError, IndexError) as err:
+            logger.warning("Memory/CPU stats read failed: %s", err)
+        sample["temp"] = THERMAL.sample()
+        sample["temps"] = THERMAL.readings
+        return sample
+
+    def _read_memory(self):
+        info = {}
+        for line in self._meminfo.read().split(b"\n"):
+            key, _, value = line.partition(b":")
+            if key in (b"MemTotal", b"MemAvailable"):
+                info[key] = int(value.split()[0]) * 1024
+        total = info[b"MemTotal"]
+        return {"mem_used": total - info[b"MemAvailable"], "mem_total": total}
+
+    def _read_cpu(self):
+        # First line: "cpu  user nice system idle iowait irq softirq steal ..."
+        fields = [int(v) for v in self._stat.read().split(b"\n", 1)[0].split()[1:9]]
+        idle = fields[3] + fields[4]
+        total = sum(fields)
+        last, self._cpu_last = self._cpu_last, (idle, total)
+        if last is None or total == last[1]:
+            return None
+        return 100.0 * (1.0 - (idle - last[0]) / (total - last[1]))
+
+
+SAMPLER = SystemSampler()
+
+
+# ---------- Bar redraws ----------
+# Pushed widget text goes through BAR_REDRAW: updates arriving in the same loop
+# pass (one sampler tick feeds several widgets on every screen) are applied
+# together. Unchanged text is dropped before any layout work; a widget whose
+# width is unchanged repaints only its own slot, and a bar with any width
+# change is laid out and drawn once.
+class BarRedrawScheduler:
+    """Coalesce widget text updates into at most one draw per bar per pass."""
+
+    def __init__(self):
+        self.pending = {}
+        self._handle = None
+
+    def update(self, target, text):
+        if text is None:
+            text = ""
+        if target not in self.pending and text == target.text:
+            return
+        self.pending[target] = text
+        if self._handle is None:
+            self._handle = qtile.call_soon(self.flush)
+
+    def flush(self):
+        self._handle = None
+        pending, self.pending = self.pending, {}
+        relayout, repaint = set(), []
+        for target, text in pending.items():
+            if text == target.text or not getattr(target, "configured", False):
+                continue
+            old_length = target.calculate_length()
+            target.text = text
+            if target.calculate_length() != old_length:
+                relayout.add(target.bar)
+            else:
+                repaint.append(target)
+        for bar_ in relayout:
+            bar_.draw()
+        for target in repaint:
+            if target.bar not in relayout:
+                target.draw()
+
+
+BAR_REDRAW = BarRedrawScheduler()
+
+
+@STARTUP.timed
+class MetricText(qtile_widgets.TextBox):
+    """TextBox fed by SAMPLER; formatter turns a sample into the widget text.
+
+    The width only ever grows, so a rate dropping from 120.0KB/s to 3.1KB/s
+    repaints this widget in place instead of shifting the rest of the bar.
+    """
+
+    def __init__(self, formatter, **config):
+        qtile_widgets.TextBox.__init__(self, text="", **config)
+        self.formatter = formatter
+        self._max_length = 0
+
+    def calculate_length(self):
+        self._max_length = max(self._max_length,
+                               qtile_widgets.TextBox.calculate_length(self))
+        return self._max_length
+
+    def _configure(self, qtile, bar):
+        qtile_widgets.TextBox._configure(self, qtile, bar)
+        SAMPLER.subscribe(self)
+
+    def finalize(self):
+        SAMPLER.unsubscribe(self)
+        qtile_widgets.TextBox.finalize(self)
+
+    def push(self, sample):
+        BAR_REDRAW.update(self, self.formatter(sample))
+
+
+def memory_status(sample):
+    if sample["mem_total"] is None:
+        return "Mem: --"
+    gib = 1024.0 ** 3
+    return f"Mem: {sample['mem_used'] / gib:.1f}/{sample['mem_total'] / gib:.1f}"
+
+
+def temp_status(sample, sensor=None):
+    """Headline (hottest CPU) reading by default, or one sensor by its "chip/label" name."""
+    value = sample["temp"] if sensor is None else sample["temps"].get(sensor)
+    if value is None:
+        return "Temp: N/A"
+    return f"Temp: {value:.0f}°C"
+
+
+# ---------- Clock ----------
+# One TICKER fires just after each wall-clock second and drives every clock,
+# so all screens change together and never drift apart. SESSION stops it
+# while the session is locked or idle (logind) or the X screen saver has
+# blanked the display, and it ticks at once on resume. Blanking is reported by
+# MIT-SCREEN-SAVER notify events on a second X connection, so nothing wakes up
+# to ask while the screen is off. A clock whose screen is covered by a
+# fullscreen window skips its repaint.
+TICK_SLACK = 0.002
+LOGIND_SESSION_INTERFACE = "org.freedesktop.login1.Session"
+
+
+def logind_session_path():
+    """Object path of this login session (sd_bus_path_encode of the id)."""
+    session_id = os.environ.get("XDG_SESSION_ID")
+    if not session_id:
+        return None
+    encoded = "".join(
+        c if c.isascii() and c.isalnum() and not (i == 0 and c.isdigit())
+        else f"_{ord(c):02x}"
+        for i, c in enumerate(session_id))
+    return f"/org/freedesktop/login1/session/{encoded}"
+
+
+class SessionState:
+    """Whether anyone can see the bars: not locked, idle or blanked."""
+
+    def __init__(self):
+        self.locked = False
+        self.idle = False
+        self.blanked = False
+        self.listeners = []
+        self._conn = None
+
+    @property
+    def active(self):
+        return not (self.locked or self.idle or self.blanked)
+
+    def start(self):
+        create_task(self._watch_logind())
+        if not is_wayland():
+            self._watch_screensaver()
+
+    async def _watch_logind(self):
+        path = logind_session_path()
+        if path is None:
+            return
+        try:
+            from libqtile.utils import add_signal_receiver
+
+            for signal, interface in (("PropertiesChanged", "org.freedesktop.DBus.Properties"),
+                                      ("Lock", LOGIND_SESSION_INTERFACE),
+                                      ("Unlock", LOGIND_SESSION_INTERFACE)):
+                await add_signal_receiver(
+                    self._on_logind_signal, session_bus=False, signal_name=signal,
+                    dbus_interface=interface, path=path)
+        except Exception as err:
+            logger.warning("logind session watch unavailable: %s", err)
+
+    def _on_logind_signal(self, message):
+        was_active = self.active
+        if message.member == "Lock":
+            self.locked = True
+        elif message.member == "Unlock":
+            self.locked = False
+        elif message.body and message.body[0] == LOGIND_SESSION_INTERFACE:
+            changed = message.body[1]
+            if "LockedHint" in changed:
+                self.locked = bool(changed["LockedHint"].value)
+            if "IdleHint" in changed:
+                self.idle = bool(changed["IdleHint"].value)
+        if self.active != was_active:
+            self._notify()
+
+    def _watch_screensaver(self):
+        if self._conn is not None:
+            return
+        try:
+            import xcffib
+            import xcffib.screensaver
+
+            conn = xcffib.connect()
+            screensaver = conn(xcffib.screensaver.key)
+            root = conn.get_setup().roots[conn.pref_screen].root
+            screensaver.SelectInput(root, xcffib.screensaver.Event.NotifyMask)
+            state = screensaver.QueryInfo(root).reply().state
+        except Exception as err:
+            logger.warning("Screen saver state unavailable; clocks won't pause when blanked: %s",
+                           err)
+            return
+        self._conn = conn
+        self._notify_event = xcffib.screensaver.NotifyEvent
+        self._blank_state = xcffib.screensaver.State.On
+        asyncio.get_event_loop().add_reader(conn.get_file_descriptor(), self._on_x_events)
+        self._set_blanked(state == self._blank_state)
+
+    def _on_x_events(self):
+        blanked = self.blanked
+        try:
+            while (event := self._conn.poll_for_event()) is not None:
+                if isinstance(event, self._notify_event):
+                    blanked = event.state == self._blank_state
+        except Exception as err:
+            logger.warning("Screen saver watch stopped: %s", err)
+            self.close()
+        self._set_blanked(blanked)
+
+    def _set_blanked(self, blanked):
+        if blanked != self.blanked:
+            self.blanked = blanked
+            self._notify()
+
+    def close(self):
+        if self._conn is not None:
+            asyncio.get_event_loop().remove_reader(self._conn.get_file_descriptor())
+            self._conn.disconnect()
+            self._conn = None
+
+    def _notify(self):
+        for callback in list(self.listeners):
+            callback(self.active)
+
+
+class SecondTicker:
+    """Calls every subscriber with time.time() just after each second boundary."""
+
+    def __init__(self, session):
+        self.subscribers = []
+        self.session = session
+        self._timer = None
+        session.listeners.append(self._on_session_change)
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        callback(time.time())
+        if self._timer is None and self.session.active:
+            self._schedule()
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+        if not self.subscribers:
+            self._cancel()
+
+    def _schedule(self):
+        self._timer = qtile.call_later(1.0 - time.time() % 1.0 + TICK_SLACK, self._tick)
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _tick(self):
+        self._schedule()
+        now = time.time()
+        for callback in list(self.subscribers):
+            callback(now)
+
+    def _on_session_change(self, active):
+        self._cancel()
+        if active and self.subscribers:
+            self._tick()
+
+
+SESSION = SessionState()
+TICKER = SecondTicker(SESSION)
+
+
+@after_startup
+def watch_session_state():
+    hand_over("_config_session", SESSION)
+    SESSION.start()
+
+
+@hook.subscribe.shutdown
+def stop_session_watch():
+    SESSION.close()
+
+
+@STARTUP.timed
+class ClockText(qtile_widgets.TextBox):
+    """strftime clock driven by TICKER instead of a timer of its own."""
+
+    def __init__(self, format="%H:%M", **config):
+        qtile_widgets.TextBox.__init__(self, text="", **config)
+        self.format = format
+
+    def _configure(self, qtile, bar):
+        qtile_widgets.TextBox._configure(self, qtile, bar)
+        TICKER.subscribe(self.tick)
+
+    def finalize(self):
+        TICKER.unsubscribe(self.tick)
+        qtile_widgets.TextBox.finalize(self)
+
+    def covered(self):
+        screen = getattr(self.bar, "screen", None)
+        win = screen.group.current_window if screen and screen.group else None
+        return win is not None and win.fullscreen
+
+    def tick(self, now):
+        if not self.covered():
+            BAR_REDRAW.update(self, time.strftime(self.format, time.localtime(now)))
+
+
+# ---------- Adaptive polling ----------
+# Poll timers (the system sampler, the update counter, Volume) go through
+# POLLER. Delays are stretched on battery, after IDLE_AFTER seconds without
+# input, and further while SESSION says nobody can see the bars. Timers of a
+# second or more are rounded up to the next wall-clock second, just after the
+# clock tick, so everything due around the same time shares one wakeup. Any
+# focus or screen change snaps stretched timers back to their normal rate.
+# Every slot wakeup re-reads the idle time, so typing into the focused window
+# does the same at the next shared wakeup, without a timer of its own.
+POWER_SUPPLY_DIR = Path("/sys/class/power_supply")
+IDLE_AFTER = 120
+BATTERY_STRETCH = 2.0
+IDLE_STRETCH = 4.0
+UNSEEN_STRETCH = 10.0
+# Volume defaults to 0.2 s, which forks amixer five times a second per bar and,
+# being under a second, bypasses the shared slots.
+VOLUME_UPDATE_INTERVAL = 1.0
+
+
+class PollHandle:
+    """One pending poll; cancel() mirrors asyncio.TimerHandle."""
+
+    __slots__ = ("args", "cancelled", "created", "delay", "func", "ran", "slot", "timer")
+
+    def __init__(self, func, args, delay):
+        self.func = func
+        self.args = args
+        self.delay = delay
+        self.created = time.time()
+        self.slot = None
+        self.timer = None
+        self.cancelled = False
+        self.ran = False
+
+    @property
+    def done(self):
+        return self.cancelled or self.ran
+
+    def cancel(self):
+        self.cancelled = True
+        if self.timer is not None:
+            self.timer.cancel()
+
+
+class PollScheduler:
+    """Shared, power- and idle-aware replacement for qtile.call_later in polls."""
+
+    def __init__(self, session):
+        self.session = session
+        self.factor = 1.0
+        self.slots = {}     # wall-clock second -> [PollHandle]
+        self._timers = {}   # wall-clock second -> TimerHandle
+        self._mains = self._discover_mains()
+        self._idle_query = True
+        session.listeners.append(lambda _active: self.update_factor())
+
+    @staticmethod
+    def _discover_mains():
+        readers = []
+        for supply in sorted(POWER_SUPPLY_DIR.glob("*")):
+            try:
+                if (supply / "type").read_text().strip() == "Mains":
+                    readers.append(ProcReader(str(supply / "online"), bufsize=8))
+            except OSError:
+                continue
+        return readers
+
+    def on_ac(self):
+        if not self._mains:
+            return True  # desktop, or no power_supply info
+        for reader in self._mains:
+            try:
+                if reader.read().strip() == b"1":
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def idle_seconds(self):
+        """Seconds since the last keyboard/mouse input (X11 only; 0 elsewhere)."""
+        if not self._idle_query or is_wayland():
+            return 0.0
+        try:
+            import xcffib.screensaver
+
+            conn = qtile.core.conn
+            reply = conn.conn(xcffib.screensaver.key).QueryInfo(
+                conn.default_screen.root.wid).reply()
+            return reply.ms_since_user_input / 1000.0
+        except Exception as err:
+            logger.warning("Idle time unavailable; polls won't stretch when idle: %s", err)
+            self._idle_query = False
+            return 0.0
+
+    def stretch(self):
+        factor = 1.0 if self.on_ac() else BATTERY_STRETCH
+        if not self.session.active:
+            factor *= UNSEEN_STRETCH
+        elif self.idle_seconds() >= IDLE_AFTER:
+            factor *= IDLE_STRETCH
+        return factor
+
+    def call_later(self, delay, func, *args):
+        handle = PollHandle(func, args, delay)
+        self._place(handle)
+        return handle
+
+    def _place(self, handle):
+        due = handle.created + handle.delay * self.factor
+        if handle.delay < 1:
+            handle.timer = qtile.call_later(max(0.0, due - time.time()), self._run, handle)
+            return
+        slot = math.ceil(due)
+        handle.slot = slot
+        self.slots.setdefault(slot, []).append(handle)
+        if slot not in self._timers:
+            self._timers[slot] = qtile.call_later(
+                max(0.0, slot + TICK_SLACK - time.time()), self._wake, slot)
+
+    def _wake(self, slot):
+        self._timers.pop(slot, None)
+        handles = self.slots.pop(slot, [])
+        self.update_factor()
+        for handle in handles:
+            self._run(handle)
+
+    def _run(self, handle):
+        if handle.cancelled:
+            return
+        handle.ran = True
+        try:
+            handle.func(*handle.args)
+        except Exception:
+            logger.exception("Poll %r failed", handle.func)
+
+    def update_factor(self):
+        factor = self.stretch()
+        snapped_back = factor < self.factor
+        self.factor = factor
+        if snapped_back:
+            self._reschedule()
+
+    def _reschedule(self):
+        """Pull pending polls forward to the (shorter) current stretch."""
+        handles = [h for slot in self.slots.values() for h in slot if not h.cancelled]
+        for timer in self._timers.values():
+            timer.cancel()
+        self.slots, self._timers = {}, {}
+        for handle in handles:
+            self._place(handle)
+
+    def activity(self):
+        if self.factor > 1.0:
+            self.update_factor()
+
+
+POLLER = PollScheduler(SESSION)
+
+
+@hook.subscribe.client_focus
+def poll_after_focus(_win):
+    POLLER.activity()
+
+
+@hook.subscribe.current_screen_change
+def poll_after_screen_change():
+    POLLER.activity()
+
+
+_adaptive_classes = {}
+
+
+def adaptive(cls):
+    """Subclass of widget class `cls` whose timeout_add() polls go via POLLER."""
+    if cls not in _adaptive_classes:
+        def timeout_add(self, seconds, method, method_args=()):
+            # Same contract as _Widget.timeout_add, which this replaces: no
+            # timers for finalized widgets, coroutines go to create_task.
+            if self.finalized:
+                return None
+            handle = POLLER.call_later(seconds, self._poll, method, *method_args)
+            self._futures = [h for h in self._futures
+                             if not (isinstance(h, PollHandle) and h.done)]
+            self._futures.append(handle)
+            return handle
+
+        def _poll(self, method, *method_args):
+            if self.finalized:
+                return
+            if asyncio.iscoroutinefunction(method):
+                create_task(method(*method_args))
+            else:
+                method(*method_args)
+
+        _adaptive_classes[cls] = STARTUP.timed(type(
+            f"Adaptive{cls.__name__}", (cls,), {"timeout_add": timeout_add, "_poll": _poll}))
+    return _adaptive_classes[cls]
+
+
 # Workspace helpers: per-screen group names and focus helpers
 BASE_GROUPS = ["DEV", "WWW", "SYS", "DOC", "VBOX", "CHAT", "MUS", "VID", "GFX"]
-# Use letter tags to keep group names unique per screen without showing numbers.
-SCREEN_TAGS = ["A", "B"]  # Extend if you add more monitors
-NUM_SCREENS = len(SCREEN_TAGS)
+
+
+def screen_tag(screen_index):
+    """Letter tags (A, B, C...) keep group names unique per screen without numbers."""
+    return chr(ord("A") + screen_index)
 
 
 def group_name(base, screen_index):
-    return f"{base}-{SCREEN_TAGS[screen_index]}"
+    return f"{base}-{screen_tag(screen_index)}"
+
+
+class GroupTopology:
+    """Lookup tables for the per-screen group split, filled by ensure_screens().
+
+    Every question the key bindings ask (which group is DEV on screen B, which
+    screen owns this group, what comes after it) is a dict lookup.
+    """
+
+    def __init__(self):
+        self.by_base = {}       # (base, screen index) -> group name
+        self.base_of = {}       # group name -> base
+        self.screen_of = {}     # group name -> screen index
+        self.position = {}      # group name -> index within its screen
+        self.ordered = {}       # screen index -> group names in BASE_GROUPS order
+
+    def add_screen(self, screen_index, groups_on_screen):
+        names = [grp.name for grp in groups_on_screen]
+        self.ordered[screen_index] = names
+        for position, grp in enumerate(groups_on_screen):
+            self.by_base[(grp.label, screen_index)] = grp.name
+            self.base_of[grp.name] = grp.label
+            self.screen_of[grp.name] = screen_index
+            self.position[grp.name] = position
+
+    def group(self, base, screen_index):
+        return self.by_base.get((base, screen_index))
+
+    def neighbour(self, name, step):
+        """Group `step` places from `name` on the same screen, wrapping around."""
+        screen_index = self.screen_of.get(name)
+        if screen_index is None:
+            return None
+        names = self.ordered[screen_index]
+        return names[(self.position[name] + step) % len(names)]
+
+    def on_screen(self, name, screen_index):
+        """The group with the same base as `name` on another screen."""
+        base = self.base_of.get(name)
+        return None if base is None else self.by_base.get((base, screen_index))
+
+
+TOPOLOGY = GroupTopology()
+
+
+def detect_monitor_count():
+    """Monitors attached right now; one when qtile isn't running (qtile check)."""
+    try:
+        return max(len(qtile.core.get_screen_info()), 1)
+    except Exception:
+        return 1
 
 
 def focus_group_on_screen(base, screen_index=None):
     def _inner(qtile):
         target_screen = screen_index if screen_index is not None else qtile.current_screen.index
-        name = group_name(base, target_screen)
+        name = TOPOLOGY.group(base, target_screen)
+        if name is None:
+            return
         qtile.to_screen(target_screen)
         qtile.groups_map[name].toscreen(target_screen)
 
@@ -218,27 +2642,383 @@ def move_window_to_group(base, screen_index=None):
     """Move focused window to the group on the given (or current) screen."""
     def _inner(qtile):
         target_screen = screen_index if screen_index is not None else qtile.current_screen.index
-        name = group_name(base, target_screen)
-        if qtile.current_window:
+        name = TOPOLOGY.group(base, target_screen)
+        if name is not None and qtile.current_window:
             qtile.current_window.togroup(name)
 
     return _inner
 
-# ---------- Status widget helpers ----------
+# ---------- Run or raise ----------
+# App keys focus the app's existing window instead of starting a second
+# instance. WINDOWS maps lower-cased wm_class names to their windows and is
+# kept current by client hooks, so the lookup on each key press is one dict get.
+APP_CLASSES = {
+    myOffice: ("libreoffice", "soffice"),
+    myVirt: ("virt-manager",),
+}
+
+
+class WindowIndex:
+    """Open windows by lower-cased wm_class (instance and class name)."""
+
+    def __init__(self):
+        self.by_class = {}   # wm_class -> {wid: window}, oldest first
+        self.classes = {}    # wid -> wm_class names it is filed under
+
+    def add(self, win):
+        try:
+            names = tuple(name.lower() for name in win.get_wm_class() or ())
+        except Exception:
+            return
+        wid = win.wid
+        if self.classes.get(wid) == names:
+            return
+        self.remove(win)
+        self.classes[wid] = names
+        for name in names:
+            self.by_class.setdefault(name, {})[wid] = win
+
+    def remove(self, win):
+        for name in self.classes.pop(win.wid, ()):
+            windows = self.by_class.get(name)
+            if windows is not None:
+                windows.pop(win.wid, None)
+                if not windows:
+                    del self.by_class[name]
+
+    def find(self, names):
+        """Most recently opened window matching any of `names`, or None."""
+        for name in names:
+            windows = self.by_class.get(name)
+            if windows:
+                return next(reversed(windows.values()))
+        return None
+
+
+WINDOWS = WindowIndex()
+
+
+@hook.subscribe.client_new
+def index_new_window(win):
+    WINDOWS.add(win)
+
+
+@hook.subscribe.client_name_updated
+def reindex_renamed_window(win):
+    # Some apps (Electron, LibreOffice) only set their class after mapping.
+    # Once a window has one, title changes don't need another property read.
+    if not WINDOWS.classes.get(win.wid):
+        WINDOWS.add(win)
+
+
+@hook.subscribe.client_killed
+def unindex_window(win):
+    WINDOWS.remove(win)
+
+
+@after_startup
+def index_existing_windows():
+    # Windows adopted across a restart, or kept across a reload, never fire
+    # client_new.
+    for win in list(qtile.windows_map.values()):
+        if hasattr(win, "get_wm_class"):
+            WINDOWS.add(win)
+
+
+def run_or_raise(command, base):
+    """Focus the window of `command` if one is open; otherwise switch to `base` and spawn it."""
+    names = APP_CLASSES.get(command, (command.split()[0].lower(),))
+
+    def _inner(qtile):
+        win = WINDOWS.find(names)
+        if win is None or win.group is None:
+            focus_group_on_screen(base)(qtile)
+            qtile.spawn(command)
+            return
+        grp = win.group
+        if grp.screen is None:
+            grp.toscreen(TOPOLOGY.screen_of.get(grp.name, qtile.current_screen.index))
+        qtile.focus_screen(grp.screen.index)
+        grp.focus(win)
+
+    return _inner
 
 
-def build_temp_widget(foreground, background):
-    """Show internal sensor temperature when available; degrade to text."""
+# ---------- Run launcher ----------
+# SUPER + Shift + Return opens the bar prompt with an in-memory index of PATH
+# executables and .desktop applications; Tab cycles matches, most used first.
+# The index is built once after startup and kept current with inotify, and
+# launches exec the command directly (no shell). Launch counts and times
+# persist in LAUNCHER_FRECENCY_FILE.
+LAUNCHER_FRECENCY_FILE = Path.home() / ".cache" / "qtile" / "launcher-frecency.json"
+# (max age in seconds, weight): recent launches count for more.
+FRECENCY_WEIGHTS = ((4 * 3600, 100), (86400, 70), (7 * 86400, 50), (30 * 86400, 30))
+
+
+def application_dirs():
+    data_home = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    data_dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+    return [os.path.join(d, "applications") for d in [data_home, *data_dirs.split(":")] if d]
+
+
+def parse_desktop_entry(path):
+    """(Name, argv) for a launchable .desktop file, or None."""
+    fields = {}
+    section = None
     try:
-        return widget.ThermalSensor(
-            foreground=foreground,
-            background=background,
-            fmt="Temp: {}",
-            padding=5,
-        )
-    except Exception as err:
-        logger.warning("Thermal sensor unavailable: %s", err)
-        return widget.TextBox(text="Temp: N/A", foreground=foreground, background=background, padding=5)
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    section = line
+                elif section == "[Desktop Entry]" and "=" in line:
+                    key, value = line.split("=", 1)
+                    fields.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+    if (fields.get("Type") != "Application" or "Exec" not in fields or "Name" not in fields
+            or fields.get("NoDisplay") == "true" or fields.get("Hidden") == "true"):
+        return None
+    try:
+        words = shlex.split(fields["Exec"])
+    except ValueError:
+        return None
+    # Drop field codes (%f, %U, ...) since nothing is passed in.
+    argv = [w.replace("%%", "%") for w in words if not (len(w) == 2 and w[0] == "%")]
+    if not argv:
+        return None
+    if fields.get("Terminal") == "true":
+        argv = [myTerm, "-e", *argv]
+    return fields["Name"], argv
+
+
+class LauncherIndex:
+    """Launchable names (executables and desktop entries) with frecency ranks."""
+
+    def __init__(self, frecency_file=LAUNCHER_FRECENCY_FILE):
+        self.frecency_file = frecency_file
+        self.executables = {}     # PATH directory -> set of names
+        self.desktop_files = {}   # .desktop path -> (Name, argv)
+        self.frecency = {}        # entry -> [launch count, last launch time]
+        self._names = None
+        try:
+            with frecency_file.open() as f:
+                self.frecency = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as err:
+            logger.warning("Ignoring unreadable launcher history: %s", err)
+
+    def build(self):
+        """Scan PATH and the application directories (run in an executor).
+
+        The tables are swapped in whole, so a prompt opened mid-scan still
+        sees a consistent (if empty) index.
+        """
+        executables, desktop_files = {}, {}
+        for directory in dict.fromkeys(os.environ.get("PATH", "").split(os.pathsep)):
+            if directory:
+                try:
+                    executables[directory] = {
+                        e.name for e in os.scandir(directory) if self._is_executable(e.path)}
+                except OSError:
+                    pass
+        for directory in application_dirs():
+            try:
+                for entry in os.scandir(directory):
+                    parsed = (parse_desktop_entry(entry.path)
+                              if entry.name.endswith(".desktop") else None)
+                    if parsed is not None:
+                        desktop_files[entry.path] = parsed
+            except OSError:
+                pass
+        self.executables, self.desktop_files = executables, desktop_files
+        self._names = None
+
+    @staticmethod
+    def _is_executable(path):
+        return os.path.isfile(path) and os.access(path, os.X_OK)
+
+    def _update_desktop(self, path):
+        parsed = parse_desktop_entry(path) if path.endswith(".desktop") else None
+        if parsed is None:
+            self.desktop_files.pop(path, None)
+        else:
+            self.desktop_files[path] = parsed
+
+    def watch(self):
+        for directory in self.executables:
+            self._watch(directory, self._on_path_change)
+        for directory in application_dirs():
+            if os.path.isdir(directory):
+                self._watch(directory, self._on_desktop_change)
+
+    def _watch(self, directory, handler):
+        try:
+            INOTIFY.watch(directory, IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+                          | IN_CLOSE_WRITE | IN_ATTRIB,
+                          lambda name, mask: handler(directory, name))
+        except OSError as err:
+            logger.warning("Launcher watch unavailable for %s: %s", directory, err)
+
+    def _on_path_change(self, directory, name):
+        names = self.executables[directory]
+        if self._is_executable(os.path.join(directory, name)):
+            names.add(name)
+        else:
+            names.discard(name)
+        self._names = None
+
+    def _on_desktop_change(self, directory, name):
+        self._update_desktop(os.path.join(directory, name))
+        self._names = None
+
+    def desktop_entries(self):
+        # Earlier directories (the user's own) win when names clash.
+        entries = {}
+        for name, argv in self.desktop_files.values():
+            entries.setdefault(name, argv)
+        return entries
+
+    def names(self):
+        if self._names is None:
+            names = set(self.desktop_entries())
+            for executables in self.executables.values():
+                names |= executables
+            self._names = sorted(names)
+        return self._names
+
+    def score(self, entry, now):
+        count, last_used = self.frecency.get(entry, (0, 0))
+        age = now - last_used
+        for max_age, weight in FRECENCY_WEIGHTS:
+            if age < max_age:
+                return count * weight
+        return count * 10
+
+    def search(self, text):
+        """Names containing `text`: prefix matches first, then by frecency."""
+        text = text.strip().lower()
+        now = time.time()
+        matches = [name for name in self.names() if text in name.lower()]
+        return sorted(matches, key=lambda name: (
+            not name.lower().startswith(text), -self.score(name, now), len(name)))
+
+    def launch(self, text):
+        text = text.strip()
+        if not text:
+            return
+        argv = self.desktop_entries().get(text)
+        if argv is None:
+            try:
+                argv = shlex.split(text)
+            except ValueError as err:
+                logger.warning("Cannot parse %r: %s", text, err)
+                return
+            entry = argv[0]
+        else:
+            entry = text
+        qtile.spawn(argv)
+        count, _last_used = self.frecency.get(entry, (0, 0))
+        self.frecency[entry] = [count + 1, time.time()]
+        self._save()
+
+    def _save(self):
+        try:
+            _atomic_write(self.frecency_file, json.dumps(self.frecency))
+        except OSError as err:
+            logger.warning("Could not write launcher history: %s", err)
+
+
+LAUNCHER = LauncherIndex()
+
+
+class FrecencyCompleter:
+    """Prompt completer over LAUNCHER; each Tab moves to the next match."""
+
+    def __init__(self, qtile, *_args, **_kwargs):
+        self.reset()
+
+    def reset(self):
+        self._matches = None
+        self._index = -1
+
+    def actual(self):
+        if self._matches and self._index >= 0:
+            return self._matches[self._index]
+        return None
+
+    def complete(self, text, *_args):
+        if self._matches is None:
+            self._matches = LAUNCHER.search(text)
+        if not self._matches:
+            return text
+        self._index = (self._index + 1) % len(self._matches)
+        return self._matches[self._index]
+
+
+@STARTUP.timed
+class LauncherPrompt(qtile_widgets.Prompt):
+    """Prompt that also knows the "launcher" completer.
+
+    Prompt builds its per-completer history (and checks the pickled one) from
+    the class-level completers when it is configured, so the completer has to
+    be there before that rather than added to the instance later.
+    """
+
+    completers: ClassVar[dict] = {**qtile_widgets.Prompt.completers,
+                                  "launcher": FrecencyCompleter}
+
+
+def open_launcher(qtile):
+    bar_ = qtile.current_screen.top
+    prompt_widget = next((w for w in bar_.widgets if isinstance(w, LauncherPrompt)), None)
+    if prompt_widget is None:
+        qtile.spawn("dm-run")
+        return
+    prompt_widget.start_input("run", LAUNCHER.launch, complete="launcher")
+
+
+@after_startup
+def build_launcher_index():
+    async def build():
+        await asyncio.get_running_loop().run_in_executor(None, LAUNCHER.build)
+        LAUNCHER.watch()
+
+    create_task(build())
+
+
+# ---------- Status widget helpers ----------
+
+
+def build_updates_widget(foreground, background):
+    """Update counter fed by UPDATES; checks finish in the background and push here."""
+    updates = adaptive(qtile_widgets.GenPollText)(
+        update_interval=UPDATES_INTERVAL,
+        func=UPDATES.poll,
+        fmt="Updates: {} ",
+        foreground=foreground,
+        background=background,
+        mouse_callbacks={
+            "Button1": UPDATES.run_upgrade
+        },
+        padding=5,
+    )
+    UPDATES.listeners.append(functools.partial(BAR_REDRAW.update, updates))
+    return updates
+
+def build_keyboard_widget(foreground, background):
+    """KeyboardLayout without its own poll; KEYBOARD pushes layout changes."""
+    keyboard = widget.KeyboardLayout(
+        configured_keyboards=[KB_LAYOUT],
+        update_interval=None,
+        foreground=foreground,
+        background=background,
+        fmt="KB: {}",
+        padding=5,
+    )
+    KEYBOARD.listeners.append(keyboard.tick)
+    return keyboard
 
 # Systray helper
 def build_tray_widget(background):
@@ -263,6 +3043,100 @@ def build_tray_widget(background):
     else:
         return widget.Systray(background=background, padding=5)
 
+# ---------- Deferred widgets ----------
+# The tray (dbus_next on Wayland), Volume and KeyboardLayout are slow to import
+# and start. Bars come up with fixed-width placeholders; the real widgets are
+# built after startup_complete, their modules imported off the event loop.
+TRAY_PLACEHOLDER_WIDTH = 40
+# Safety net for starts that never fire startup_complete (config reloads).
+DEFERRED_FALLBACK_DELAY = 5
+
+
+class DeferredWidgetQueue:
+    """Builds placeholders' real widgets one at a time once startup is done."""
+
+    def __init__(self):
+        self.pending = []
+        self.ready = False
+        self._task = None
+
+    def add(self, placeholder):
+        self.pending.append(placeholder)
+        if self.ready:
+            self.start()
+        else:
+            qtile.call_later(DEFERRED_FALLBACK_DELAY, self.start)
+
+    def start(self):
+        self.ready = True
+        if self.pending and (self._task is None or self._task.done()):
+            self._task = create_task(self._build_pending())
+
+    async def _build_pending(self):
+        loop = asyncio.get_running_loop()
+        while self.pending:
+            placeholder = self.pending.pop(0)
+            for module in placeholder.preload:
+                try:
+                    await loop.run_in_executor(None, importlib.import_module, module)
+                except ImportError:
+                    pass  # the factory decides how to degrade
+            if placeholder.bar is not None and placeholder in placeholder.bar.widgets:
+                placeholder.swap()
+            # Let qtile handle events between widgets.
+            await asyncio.sleep(0)
+
+
+DEFERRED_WIDGETS = DeferredWidgetQueue()
+
+
+@hook.subscribe.startup_complete
+def build_deferred_widgets():
+    DEFERRED_WIDGETS.start()
+
+
+@STARTUP.timed
+class DeferredWidget(widget_base._Widget):
+    """Fixed-width blank slot replaced by factory() after startup."""
+
+    def __init__(self, factory, width, preload=(), **config):
+        widget_base._Widget.__init__(self, width, **config)
+        self.factory = factory
+        self.preload = preload
+
+    def _configure(self, qtile, bar):
+        widget_base._Widget._configure(self, qtile, bar)
+        DEFERRED_WIDGETS.add(self)
+
+    def draw(self):
+        self.drawer.clear(self.background or self.bar.background)
+        self.drawer.draw(offsetx=self.offsetx, offsety=self.offsety, width=self.length)
+
+    def swap(self):
+        """Put the real widget (or nothing, if factory() gives None) in our slot."""
+        host = self.bar
+        try:
+            real = self.factory()
+        except Exception:
+            logger.exception("Deferred widget failed to build")
+            real = None
+
+        index = host.widgets.index(self)
+        if real is None:
+            host.widgets.pop(index)
+        else:
+            host.widgets[index] = real
+            self.qtile.register_widget(real)
+            if hasattr(host, "_configure_widget"):
+                host._configure_widget(real)
+            else:
+                real._configure(self.qtile, host)
+        self.qtile.widgets_map.pop(self.name, None)
+        self.finalize()
+        host._resize(host.length, host.widgets)
+        host.draw()
+
+
 # Qtile cannot restart under Wayland; reload the config there instead.
 restart_binding = lazy.reload_config() if is_wayland() else lazy.restart()
 
@@ -270,11 +3144,11 @@ restart_binding = lazy.reload_config() if is_wayland() else lazy.restart()
 
 keys = [
     # The essentials
-    Key([mod, "shift"], "Return", lazy.spawn("dm-run"), desc="Run Launcher"),
+    Key([mod, "shift"], "Return", lazy.function(open_launcher), desc="Run Launcher"),
     Key([mod, "shift"], "r", restart_binding,
         desc="Reload config (Wayland) / Restart Qtile (X11)"),
     Key([mod, "shift"], "q", lazy.shutdown(), desc="Shutdown Qtile"),
-    Key([mod, "shift"], "e", lazy.spawn("emacsclient -c -a emacs"), desc="Doom Emacs"),
+    Key([mod, "shift"], "e", lazy.function(emacs_frame()), desc="Doom Emacs"),
     Key([mod], "Tab", lazy.next_layout(), desc="Toggle through layouts"),
     Key([mod], "q", lazy.window.kill(), desc="Kill active window"),
 
@@ -284,43 +3158,30 @@ keys = [
         lazy.spawn(myTerm),
         desc="Launch terminal (DEV workspace)"),
     Key([mod], "b",
-        lazy.function(focus_group_on_screen("WWW")),
-        lazy.spawn(myBrowser),
+        lazy.function(run_or_raise(myBrowser, "WWW")),
         desc="Firefox"),
     Key([mod], "v",
-        lazy.function(focus_group_on_screen("VBOX")),
-        lazy.spawn(myVirt),
+        lazy.function(run_or_raise(myVirt, "VBOX")),
         desc="virt-manager"),
     Key([mod], "o",
-        lazy.function(focus_group_on_screen("DOC")),
-        lazy.spawn(myOffice),
+        lazy.function(run_or_raise(myOffice, "DOC")),
         desc="LibreOffice"),
     Key([mod], "a",
-        lazy.function(focus_group_on_screen("VID")),
-        lazy.spawn(myPrime),
+        lazy.function(run_or_raise(myPrime, "VID")),
         desc="Prime Video"),
     Key([mod, "shift"], "n",
-        lazy.function(focus_group_on_screen("VID")),
-        lazy.spawn(myNetflix),
+        lazy.function(run_or_raise(myNetflix, "VID")),
         desc="Netflix"),
     Key([mod], "c",
-        lazy.function(focus_group_on_screen("CHAT")),
-        lazy.spawn(myChat),
+        lazy.function(run_or_raise(myChat, "CHAT")),
         desc="WhatsApp"),
     Key([mod], "m",
-        lazy.function(focus_group_on_screen("MUS")),
-        lazy.spawn(myYTMusic),
+        lazy.function(run_or_raise(myYTMusic, "MUS")),
         desc="YouTube Music"),
     Key([mod], "y",
-        lazy.function(focus_group_on_screen("VID")),
-        lazy.spawn(myYouTube),
+        lazy.function(run_or_raise(myYouTube, "VID")),
         desc="YouTube"),
 
-    # Focus specific monitor (0,1,2). Use Ctrl+Super+e to keep the Super+e chord free.
-    Key([mod], "w", lazy.to_screen(0), desc="Focus monitor 1"),
-    Key([mod, "control"], "e", lazy.to_screen(1), desc="Focus monitor 2"),
-    Key([mod], "r", lazy.to_screen(2), desc="Focus monitor 3"),
-
     # Cycle monitors
     Key([mod], "period", lazy.next_screen(), desc="Focus next monitor"),
     Key([mod], "comma", lazy.prev_screen(), desc="Focus previous monitor"),
@@ -381,33 +3242,31 @@ keys = [
     # Emacs key chord: SUPER + e then key
     KeyChord([mod], "e", [
         Key([], "e",
-            lazy.spawn("emacsclient -c -a 'emacs'"),
+            lazy.function(emacs_frame()),
             desc="Emacsclient Dashboard"),
         Key([], "a",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(emms)' "
-                       "--eval '(emms-play-directory-tree \"~/Music/\")'"),
+            lazy.function(emacs_frame("(emms)", '(emms-play-directory-tree "~/Music/")')),
             desc="EMMS music"),
         Key([], "b",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(ibuffer)'"),
+            lazy.function(emacs_frame("(ibuffer)")),
             desc="Emacs Ibuffer"),
         Key([], "d",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(dired nil)'"),
+            lazy.function(emacs_frame("(dired nil)")),
             desc="Emacs Dired"),
         Key([], "i",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(erc)'"),
+            lazy.function(emacs_frame("(erc)")),
             desc="Emacs ERC"),
         Key([], "n",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(elfeed)'"),
+            lazy.function(emacs_frame("(elfeed)")),
             desc="Emacs Elfeed"),
         Key([], "s",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(eshell)'"),
+            lazy.function(emacs_frame("(eshell)")),
             desc="Emacs Eshell"),
         Key([], "v",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(+vterm/here nil)'"),
+            lazy.function(emacs_frame("(+vterm/here nil)")),
             desc="Emacs Vterm"),
         Key([], "w",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval "
-                       "'(doom/window-maximize-buffer(eww \"distro.tube\"))'"),
+            lazy.function(emacs_frame('(doom/window-maximize-buffer (eww "distro.tube"))')),
             desc="Emacs EWW browser"),
     ]),
 
@@ -415,7 +3274,22 @@ keys = [
     KeyChord([mod], "p", [
         Key([], "h", lazy.spawn("dm-hub"), desc="List all dmscripts"),
         Key([], "a", lazy.spawn("dm-sounds"), desc="Choose ambient sound"),
-        Key([], "b", lazy.spawn("dm-setbg"), desc="Set background"),
+        KeyChord([], "b", [
+            Key([], "Left", lazy.function(picker_move, -1, 0), desc="Previous wallpaper"),
+            Key([], "Right", lazy.function(picker_move, 1, 0), desc="Next wallpaper"),
+            Key([], "Up", lazy.function(picker_move, 0, -1), desc="Wallpaper row up"),
+            Key([], "Down", lazy.function(picker_move, 0, 1), desc="Wallpaper row down"),
+            Key([], "h", lazy.function(picker_move, -1, 0), desc="Previous wallpaper"),
+            Key([], "l", lazy.function(picker_move, 1, 0), desc="Next wallpaper"),
+            Key([], "k", lazy.function(picker_move, 0, -1), desc="Wallpaper row up"),
+            Key([], "j", lazy.function(picker_move, 0, 1), desc="Wallpaper row down"),
+            Key([], "Return", lazy.function(picker_choose), lazy.ungrab_all_chords(),
+                desc="Set background"),
+            Key(["shift"], "Return", lazy.function(picker_choose, True),
+                lazy.ungrab_all_chords(), desc="Set background and colors"),
+            Key([], "Escape", lazy.ungrab_all_chords(), desc="Close picker"),
+        ], mode=True, name="wallpaper"),
+        Key(["shift"], "b", lazy.spawn("dm-setbg"), desc="Set background (dmenu)"),
         Key([], "c", lazy.spawn("dtos-colorscheme"), desc="Color scheme"),
         Key([], "e", lazy.spawn("dm-confedit"), desc="Edit config file"),
         Key([], "i", lazy.spawn("dm-maim"), desc="Take screenshot"),
@@ -440,17 +3314,26 @@ def build_screen_groups(screen_index):
             name=group_name(base, screen_index),
             label=base,
             layout="floating" if base == "GFX" else "bsp",
+            screen_affinity=screen_index,
         )
         for base in BASE_GROUPS
     ]
 
 
-screen_groups = {index: build_screen_groups(index) for index in range(NUM_SCREENS)}
-groups = [grp for screen_list in screen_groups.values() for grp in screen_list]
+# Filled per attached monitor by ensure_screens() further down.
+screen_groups = {}
+groups = []
 
 # Use custom bindings below instead of simple_key_binder to keep groups pinned per screen
 dgroups_key_binder = None
 
+# Focus a specific monitor. Use Ctrl+Super+e to keep the Super+e chord free.
+# Keys for monitors that are not attached are a no-op in qtile.
+MONITOR_KEYS = [([mod], "w"), ([mod, "control"], "e"), ([mod], "r")]
+for index, (modifiers, keyname) in enumerate(MONITOR_KEYS):
+    keys.append(Key(modifiers, keyname, lazy.to_screen(index),
+                    desc=f"Focus monitor {index + 1}"))
+
 # Group keybindings: mod+number follows the currently focused monitor
 for index, base in enumerate(BASE_GROUPS, start=1):
     keys.extend([
@@ -472,6 +3355,90 @@ def set_default_layouts():
             grp.setlayout("floating")
         else:
             grp.setlayout("bsp")
+    pin_screen_groups()
+
+
+# ---------- inotify helper ----------
+# Small ctypes wrapper so file watches run on qtile's event loop without
+# pulling in pyinotify or watchdog.
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """One inotify descriptor; each watch maps to a callback(name, mask)."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = None
+        self._watches = {}
+
+    def _ensure_fd(self):
+        if self.fd is None:
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            self.fd = fd
+            asyncio.get_event_loop().add_reader(fd, self._dispatch)
+
+    def watch(self, path, mask, callback):
+        """Watch a directory (or file) from qtile's event loop; returns the wd."""
+        self._ensure_fd()
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {path}")
+        callbacks = self._watches.setdefault(wd, [])
+        if callback not in callbacks:
+            callbacks.append(callback)
+        return wd
+
+    def _dispatch(self):
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            for callback in self._watches.get(wd, ()):
+                try:
+                    callback(name, mask)
+                except Exception:
+                    logger.exception("inotify callback failed for %s", name)
+
+    def close(self):
+        if self.fd is not None:
+            asyncio.get_event_loop().remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = None
+            self._watches.clear()
+
+
+INOTIFY = Inotify()
+
+
+# The previous import's descriptor is still registered on the loop after a
+# config reload.
+@hook.subscribe.startup
+def take_over_inotify():
+    hand_over("_config_inotify", INOTIFY)
+
+
+@hook.subscribe.shutdown
+def close_inotify():
+    INOTIFY.close()
+
+
+STARTUP.mark("helpers, samplers, keys and groups")
 
 
 # ---------- Colors ----------
@@ -490,42 +3457,105 @@ FALLBACK_COLORS = [
 ]
 
 
-def load_wal_colors():
+WAL_COLORS_FILE = Path.home() / ".cache" / "wal" / "colors.json"
+# Resolved palette keyed by the colors.json mtime/size; marshal loads far faster
+# than json plus the fallback logic below.
+PALETTE_CACHE_FILE = Path.home() / ".cache" / "qtile" / "palette.bin"
+
+
+def _resolve_wal_palette(cache_file):
+    with cache_file.open() as f:
+        wal = json.load(f)
+    palette = wal.get("colors", {})
+    special = wal.get("special", {})
+
+    def pick(key, fallback):
+        return palette.get(key, fallback)
+
+    background = special.get("background", pick("color0", FALLBACK_COLORS[0][0]))
+    foreground = special.get("foreground", pick("color7", FALLBACK_COLORS[2][0]))
+
+    return [
+        [background, background],
+        [pick("color0", FALLBACK_COLORS[1][0])] * 2,
+        [foreground, foreground],
+        [pick("color1", FALLBACK_COLORS[3][0])] * 2,
+        [pick("color2", FALLBACK_COLORS[4][0])] * 2,
+        [pick("color3", FALLBACK_COLORS[5][0])] * 2,
+        [pick("color4", FALLBACK_COLORS[6][0])] * 2,
+        [pick("color5", FALLBACK_COLORS[7][0])] * 2,
+        [pick("color6", FALLBACK_COLORS[8][0])] * 2,
+        [pick("color7", FALLBACK_COLORS[9][0])] * 2,
+    ]
+
+
+def load_wal_colors(cache_file=WAL_COLORS_FILE):
     """Pull colors from pywal cache; fall back to a static palette."""
-    cache_file = Path.home() / ".cache" / "wal" / "colors.json"
-    if not cache_file.exists():
-        return FALLBACK_COLORS
+    # Always hand out fresh lists: apply_palette() repaints by mutating them.
+    try:
+        stat = cache_file.stat()
+    except OSError:
+        return [list(entry) for entry in FALLBACK_COLORS]
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    try:
+        with PALETTE_CACHE_FILE.open("rb") as f:
+            cached = marshal.load(f)
+        if tuple(cached["key"]) == key:
+            return cached["palette"]
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
 
     try:
-        with cache_file.open() as f:
-            wal = json.load(f)
-        palette = wal.get("colors", {})
-        special = wal.get("special", {})
-
-        def pick(key, fallback):
-            return palette.get(key, fallback)
-
-        background = special.get("background", pick("color0", FALLBACK_COLORS[0][0]))
-        foreground = special.get("foreground", pick("color7", FALLBACK_COLORS[2][0]))
-
-        return [
-            [background, background],
-            [pick("color0", FALLBACK_COLORS[1][0])] * 2,
-            [foreground, foreground],
-            [pick("color1", FALLBACK_COLORS[3][0])] * 2,
-            [pick("color2", FALLBACK_COLORS[4][0])] * 2,
-            [pick("color3", FALLBACK_COLORS[5][0])] * 2,
-            [pick("color4", FALLBACK_COLORS[6][0])] * 2,
-            [pick("color5", FALLBACK_COLORS[7][0])] * 2,
-            [pick("color6", FALLBACK_COLORS[8][0])] * 2,
-            [pick("color7", FALLBACK_COLORS[9][0])] * 2,
-        ]
+        palette = _resolve_wal_palette(cache_file)
     except Exception as err:
         logger.warning("Falling back to default colors (wal load failed): %s", err)
-        return FALLBACK_COLORS
+        return [list(entry) for entry in FALLBACK_COLORS]
+
+    try:
+        _atomic_write(PALETTE_CACHE_FILE, marshal.dumps({"key": key, "palette": palette}))
+    except OSError as err:
+        logger.warning("Could not write palette cache: %s", err)
+    return palette
 
 
-colors = load_wal_colors()
+# ---------- Themes ----------
+# colors.py palettes have 9 entries (bg, fg, color01..06, one accent) while this
+# config uses the 10 pywal-style slots above. Slot i takes THEME_SLOTS[i].
+THEME_FILE = Path.home() / ".cache" / "qtile" / "theme"
+THEME_SLOTS = (0, 2, 1, 3, 4, 5, 6, 7, 8, 1)
+
+
+def theme_palettes():
+    if color_themes is None:
+        return {}
+    return {
+        name: value
+        for name, value in vars(color_themes).items()
+        if not name.startswith("_") and isinstance(value, list) and len(value) == 9
+    }
+
+
+def theme_palette(name):
+    """Map a colors.py palette onto the 10 config slots; None if unknown."""
+    theme = theme_palettes().get(name)
+    if theme is None:
+        return None
+    return [list(theme[index]) for index in THEME_SLOTS]
+
+
+def load_startup_palette():
+    """The last theme picked with set_theme, otherwise the pywal palette."""
+    try:
+        name = THEME_FILE.read_text().strip()
+    except OSError:
+        return load_wal_colors()
+    return theme_palette(name) or load_wal_colors()
+
+
+STARTUP.mark("color helpers")
+colors = load_startup_palette()
+STARTUP.mark("palette (load_startup_palette)")
 
 
 # ---------- Layouts ----------
@@ -570,6 +3600,92 @@ layouts = [
     ),
     layout.Floating(**layout_theme),
 ]
+STARTUP.mark("layouts")
+
+
+def apply_palette(palette):
+    """Repaint bars and layout borders in place from a 10-entry palette.
+
+    Widgets keep references to the lists in `colors`, so overwriting those
+    lists and drawing each bar once recolors everything without a restart.
+    """
+    for slot, entry in zip(colors, palette):
+        slot[:] = entry
+    layout_theme.update(border_focus=colors[6][0], border_normal=colors[1][0])
+
+    for lay in layouts:
+        if hasattr(lay, "border_focus"):
+            lay.border_focus = layout_theme["border_focus"]
+            lay.border_normal = layout_theme["border_normal"]
+    for grp in qtile.groups:
+        for lay in grp.layouts:
+            if hasattr(lay, "border_focus"):
+                lay.border_focus = layout_theme["border_focus"]
+                lay.border_normal = layout_theme["border_normal"]
+        if grp.screen is not None:
+            grp.layout_all()
+
+    for scr in qtile.screens:
+        for gap in scr.gaps:
+            if isinstance(gap, bar.Bar):
+                gap.draw()
+
+
+def set_theme(name):
+    """Repaint with a colors.py palette by name, or "wal" to return to pywal."""
+    if name == "wal":
+        THEME_FILE.unlink(missing_ok=True)
+        apply_palette(load_wal_colors())
+        return
+
+    palette = theme_palette(name)
+    if palette is None:
+        logger.warning("Unknown theme %r (available: %s)",
+                       name, ", ".join(sorted(theme_palettes())))
+        return
+    try:
+        THEME_FILE.parent.mkdir(parents=True, exist_ok=True)
+        THEME_FILE.write_text(name)
+    except OSError as err:
+        logger.warning("Could not remember theme: %s", err)
+    apply_palette(palette)
+
+
+# qtile cmd-obj -o cmd -f fire_user_hook -a set_theme -a Nord
+@hook.subscribe.user("set_theme")
+def set_theme_command(name="wal"):
+    set_theme(name)
+
+
+def _reload_wal_palette():
+    global _wal_reload_timer
+    _wal_reload_timer = None
+    # A fresh pywal run wins over a previously picked colors.py theme.
+    THEME_FILE.unlink(missing_ok=True)
+    apply_palette(load_wal_colors())
+    logger.info("Applied new pywal palette")
+
+
+_wal_reload_timer = None
+
+
+def _on_wal_change(name, _mask):
+    global _wal_reload_timer
+    if name != WAL_COLORS_FILE.name:
+        return
+    # pywal writes several files in a burst; settle before repainting.
+    if _wal_reload_timer is not None:
+        _wal_reload_timer.cancel()
+    _wal_reload_timer = qtile.call_later(0.2, _reload_wal_palette)
+
+
+@after_startup
+def watch_wal_colors():
+    try:
+        WAL_COLORS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        INOTIFY.watch(WAL_COLORS_FILE.parent, IN_CLOSE_WRITE | IN_MOVED_TO, _on_wal_change)
+    except OSError as err:
+        logger.warning("pywal palette watch unavailable: %s", err)
 
 
 prompt = "{0}@{1}: ".format(os.environ["USER"], socket.gethostname())
@@ -646,6 +3762,13 @@ def init_widgets_list(visible_groups, include_systray=True):
             padding=2,
             fontsize=14,
         ),
+        LauncherPrompt(
+            prompt=prompt,
+            foreground=colors[6],
+            background=colors[0],
+            cursor_color=colors[2],
+            padding=5,
+        ),
         widget.WindowName(
             foreground=colors[6],
             background=colors[0],
@@ -655,9 +3778,12 @@ def init_widgets_list(visible_groups, include_systray=True):
 
     # Qtile only supports one systray; avoid adding it to every monitor
     if include_systray:
-        tray = build_tray_widget(colors[0])
-        if tray:
-            widgets.append(tray)
+        widgets.append(DeferredWidget(
+            lambda: build_tray_widget(colors[0]),
+            width=TRAY_PLACEHOLDER_WIDTH,
+            preload=("dbus_next",) if is_wayland() else (),
+            background=colors[0],
+        ))
 
     widgets += [
         widget.Sep(
@@ -669,61 +3795,53 @@ def init_widgets_list(visible_groups, include_systray=True):
 
         # Right side status with powerline separators
         powerline(colors[0], colors[3]),
-        widget.GenPollText(
-            func=net_status,
-            update_interval=2,
+        MetricText(
+            formatter=net_status,
             foreground=colors[1],
             background=colors[3],
             padding=5,
         ),
         powerline(colors[3], colors[4]),
-        widget.GenPollText(
-            func=build_temp_widget,
-            update_interval=900,
+        MetricText(
+            formatter=temp_status,
             foreground=colors[1],
             background=colors[4],
             padding=5,
         ),
         powerline(colors[4], colors[5]),
-        widget.GenPollText(
-            update_interval=1800,
-            func=total_updates_count,
-            fmt="Updates: {} ",
-            foreground=colors[1],
-            background=colors[5],
-            mouse_callbacks={
-                "Button1": lambda: qtile.spawn(myTerm + " -e yay -Syu")
-            },
-            padding=5,
-        ),
+        build_updates_widget(colors[1], colors[5]),
         powerline(colors[5], colors[6]),
-        widget.Memory(
+        MetricText(
+            formatter=memory_status,
             foreground=colors[1],
             background=colors[6],
             mouse_callbacks={
                 "Button1": lambda: qtile.spawn(myTerm + " -e htop")
             },
-            measure_mem="G",
-            format="{MemUsed:.1f}/{MemTotal:.1f}",
-            fmt="Mem: {}",
             padding=5,
         ),
         powerline(colors[6], colors[7]),
-        widget.Volume(
-            foreground=colors[1],
+        DeferredWidget(
+            lambda: adaptive(qtile_widgets.Volume)(
+                update_interval=VOLUME_UPDATE_INTERVAL,
+                foreground=colors[1],
+                background=colors[7],
+                fmt="Vol: {}",
+                padding=5,
+            ),
+            width=60,
+            preload=("libqtile.widget.volume",),
             background=colors[7],
-            fmt="Vol: {}",
-            padding=5,
         ),
         powerline(colors[7], colors[8]),
-        widget.KeyboardLayout(
-            foreground=colors[1],
+        DeferredWidget(
+            lambda: build_keyboard_widget(colors[1], colors[8]),
+            width=45,
+            preload=("libqtile.widget.keyboardlayout",),
             background=colors[8],
-            fmt="KB: {}",
-            padding=5,
         ),
         powerline(colors[8], colors[9]),
-        widget.Clock(
+        ClockText(
             foreground=colors[1],
             background=colors[9],
             format="%A, %B %d - %H:%M:%S ",
@@ -733,22 +3851,168 @@ def init_widgets_list(visible_groups, include_systray=True):
     return widgets
 
 
-def init_widgets_screen1():
-    return init_widgets_list([g.name for g in screen_groups[0]], include_systray=True)
-
-
-def init_widgets_screen2():
-    return init_widgets_list([g.name for g in screen_groups[1]], include_systray=False)
-
-
-def init_screens():
-    return [
-        Screen(top=bar.Bar(widgets=init_widgets_screen1(), opacity=1.0, size=20)),
-        Screen(top=bar.Bar(widgets=init_widgets_screen2(), opacity=1.0, size=20)),
-    ]
-
-
-screens = init_screens()
+def init_screen(screen_index):
+    visible_groups = [g.name for g in screen_groups[screen_index]]
+    # Qtile only supports one systray; keep it on the first monitor
+    widgets = init_widgets_list(visible_groups, include_systray=screen_index == 0)
+    return Screen(top=bar.Bar(widgets=widgets, opacity=1.0, size=20))
+
+
+# qtile.config.screens is this same list, so screens appended on hotplug are
+# picked up by qtile.reconfigure_screens().
+screens = []
+
+
+def ensure_screens(count, live=False):
+    """Build groups and a bar for each monitor index not seen before.
+
+    Screens of detached monitors stay in the list with their bars and groups,
+    so re-docking reuses them and attached monitors are never rebuilt.
+    """
+    for index in range(len(screens), count):
+        screen_groups[index] = build_screen_groups(index)
+        TOPOLOGY.add_screen(index, screen_groups[index])
+        for grp in screen_groups[index]:
+            if live:
+                qtile.add_group(grp.name, layout=grp.layout, label=grp.label,
+                                screen_affinity=index)
+            else:
+                groups.append(grp)
+        screens.append(init_screen(index))
+
+
+STARTUP.mark("theme and widget helpers")
+ensure_screens(detect_monitor_count())
+STARTUP.mark("screens, bars and widgets (init_screens)")
+
+
+def pin_screen_groups():
+    """Move any screen showing another screen's group back to its own DEV group."""
+    for index, scr in enumerate(qtile.screens):
+        if scr.group is not None and scr.group.name.endswith(f"-{screen_tag(index)}"):
+            continue
+        target = qtile.groups_map.get(group_name(BASE_GROUPS[0], index))
+        if target is not None:
+            scr.set_group(target)
+
+
+# Grow screens/groups on dock, then let qtile re-map them. Replaces the built-in
+# reconfigure_screens handler, which would otherwise reconfigure a second time.
+@hook.subscribe.screen_change
+def grow_screens_on_hotplug(*_args):
+    ensure_screens(detect_monitor_count(), live=True)
+    qtile.reconfigure_screens()
+
+
+@hook.subscribe.screens_reconfigured
+def pin_groups_after_hotplug():
+    pin_screen_groups()
+
+
+# ---------- Key latency ----------
+# Opt-in (QTILE_PROFILE_KEYS=1): every binding in `keys`, including those in
+# key chords, gets marker calls around each chained lazy command, so each press
+# records its total time and the share of every step. The last
+# KEY_LATENCY_SAMPLES presses per binding are kept. Work that a command hands
+# off to the event loop (spawns, tasks) is not included.
+PROFILE_KEY_LATENCY = os.environ.get("QTILE_PROFILE_KEYS") == "1"
+KEY_LATENCY_SAMPLES = 256
+KEY_LATENCY_BUCKETS = (0.001, 0.005, 0.016, 0.050, 0.100)
+KEY_LATENCY_REPORT_FILE = Path.home() / ".cache" / "qtile" / "key-latency.txt"
+
+
+def _command_label(cmd):
+    name = ".".join(str(part) for selector in cmd.selectors for part in selector
+                    if part is not None)
+    name = f"{name}.{cmd.name}" if name else cmd.name
+    if cmd.name == "function" and cmd.args:
+        func = cmd.args[0]
+        return f"function({getattr(func, '__qualname__', repr(func))})"
+    return name
+
+
+def _key_label(key, prefix=""):
+    label = "+".join([*key.modifiers, key.key])
+    return f"{prefix} {label}" if prefix else label
+
+
+class KeyLatencyRecorder:
+    """Rolling per-binding and per-step timings for instrumented keys."""
+
+    def __init__(self, samples=KEY_LATENCY_SAMPLES):
+        self.samples = samples
+        self.totals = {}    # binding -> deque of seconds
+        self.steps = {}     # binding -> [(command label, deque of seconds)]
+        self._start = {}
+        self._last = {}
+
+    def instrument(self, bindings, prefix=""):
+        for key in bindings:
+            if isinstance(key, KeyChord):
+                self.instrument(key.submappings, _key_label(key, prefix))
+            elif key.commands:
+                self._wrap(key, _key_label(key, prefix))
+
+    def _wrap(self, key, binding):
+        self.totals[binding] = deque(maxlen=self.samples)
+        self.steps[binding] = [(_command_label(cmd), deque(maxlen=self.samples))
+                               for cmd in key.commands]
+        commands = [lazy.function(self._begin, binding)]
+        for index, cmd in enumerate(key.commands):
+            commands += [cmd, lazy.function(self._lap, binding, index)]
+        key.commands = commands
+
+    def _begin(self, qtile, binding):
+        self._start[binding] = self._last[binding] = time.perf_counter()
+
+    def _lap(self, qtile, binding, index):
+        now = time.perf_counter()
+        steps = self.steps[binding]
+        steps[index][1].append(now - self._last[binding])
+        self._last[binding] = now
+        if index == len(steps) - 1:
+            self.totals[binding].append(now - self._start[binding])
+
+    def report(self):
+        def ms(seconds):
+            return f"{seconds * 1000.0:.1f} ms"
+
+        def percentile(values, fraction):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+        pressed = [(binding, totals) for binding, totals in self.totals.items() if totals]
+        if not pressed:
+            return "Key latency: no instrumented key presses recorded"
+        pressed.sort(key=lambda item: -percentile(item[1], 0.95))
+        lines = [f"Key latency (last {self.samples} presses per binding, slowest p95 first):"]
+        for binding, totals in pressed:
+            counts = [0] * (len(KEY_LATENCY_BUCKETS) + 1)
+            for value in totals:
+                counts[sum(value >= edge for edge in KEY_LATENCY_BUCKETS)] += 1
+            buckets = " ".join(
+                f"<{edge * 1000:g}ms:{count}"
+                for edge, count in zip(KEY_LATENCY_BUCKETS, counts))
+            lines.append(
+                f"  {binding}  n={len(totals)}  p50 {ms(percentile(totals, 0.5))}"
+                f"  p95 {ms(percentile(totals, 0.95))}  max {ms(max(totals))}"
+                f"  [{buckets} >={KEY_LATENCY_BUCKETS[-1] * 1000:g}ms:{counts[-1]}]")
+            for label, values in self.steps[binding]:
+                if values:
+                    lines.append(f"      {label}  p50 {ms(percentile(values, 0.5))}"
+                                 f"  p95 {ms(percentile(values, 0.95))}  max {ms(max(values))}")
+        return "\n".join(lines)
+
+
+KEY_LATENCY = KeyLatencyRecorder()
+if PROFILE_KEY_LATENCY:
+    KEY_LATENCY.instrument(keys)
+
+
+# qtile cmd-obj -o cmd -f fire_user_hook -a key_latency
+@hook.subscribe.user("key_latency")
+def key_latency_command():
+    write_report(KEY_LATENCY_REPORT_FILE, KEY_LATENCY.report())
 
 
 # ---------- Mouse, floating, general behaviour ----------
@@ -786,7 +4050,36 @@ floating_layout = layout.Floating(
 
 auto_fullscreen = True
 focus_on_window_activation = "smart"
-reconfigure_screens = True
+reconfigure_screens = False  # handled by grow_screens_on_hotplug
 auto_minimize = True
 
 wmname = "LG3D"
+
+
+STARTUP.mark("mouse, rules and general settings")
+STARTUP.finish_config()
+
+
+def log_startup_report():
+    report = STARTUP.report()
+    write_report(STARTUP_REPORT_FILE, report)
+    return report
+
+
+# Subscribed last so every other startup_complete handler has been timed.
+@hook.subscribe.startup_complete
+def report_startup():
+    STARTUP.ready_time = time.perf_counter() - STARTUP.t0
+    log_startup_report()
+
+
+# qtile cmd-obj -o cmd -f fire_user_hook -a startup_report
+@hook.subscribe.user("startup_report")
+def startup_report_command():
+    log_startup_report()
+
+
+# qtile cmd-obj -o cmd -f fire_user_hook -a hook_stats
+@hook.subscribe.user("hook_stats")
+def hook_stats_command():
+    write_report(HOOK_STATS_FILE, HOOK_PROFILE.report())
@@ -0,0 +1,71 @@
+"""Launcher prompt tests.
+
+config.py builds the whole desktop when imported, so the objects under test
+are compiled on their own from its source, against libqtile's real Prompt.
+"""
+import ast
+import pickle
+from pathlib import Path
+from types import SimpleNamespace
+from typing import ClassVar
+from unittest import mock
+
+import pytest
+
+try:
+    from libqtile import widget as widgets
+    from libqtile.widget import prompt  # noqa: F401 - loads cairo and pango
+except (ImportError, OSError) as err:  # OSError: the native libraries are missing
+    pytest.skip(f"libqtile widgets unavailable: {err}", allow_module_level=True)
+
+CONFIG_FILE = Path(__file__).resolve().parent.parent / "config.py"
+
+
+def load_config_objects(names, **namespace):
+    """Run only the named top-level definitions of config.py in `namespace`."""
+    tree = ast.parse(CONFIG_FILE.read_text())
+    body = [node for node in tree.body
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef)) and node.name in names]
+    assert {node.name for node in body} == set(names)
+    code = compile(ast.Module(body=body, type_ignores=[]), str(CONFIG_FILE), "exec")
+    exec(code, namespace)  # noqa: S102 - our own config source
+    return namespace
+
+
+@pytest.fixture
+def launcher_prompt(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    config = load_config_objects(
+        ("FrecencyCompleter", "LauncherPrompt"),
+        ClassVar=ClassVar,
+        qtile_widgets=widgets,
+        STARTUP=SimpleNamespace(timed=lambda cls: cls),
+        LAUNCHER=SimpleNamespace(search=lambda text: [text + "-app"]),
+    )
+    prompt = config["LauncherPrompt"](record_history=True)
+    prompt.qtile = mock.Mock()
+    prompt.bar = mock.Mock()
+    prompt.timeout_add = mock.Mock()
+    prompt._update = mock.Mock()
+    return prompt
+
+
+def test_start_input_with_launcher_completer(launcher_prompt):
+    launcher_prompt.start_input("run", mock.Mock(), complete="launcher")
+
+    assert launcher_prompt.active
+    assert launcher_prompt.completer_history is launcher_prompt.history["launcher"]
+    assert launcher_prompt.completer.complete("fire") == "fire-app"
+
+
+def test_launcher_history_survives_saved_history(tmp_path, launcher_prompt):
+    # A history file written by a plain Prompt lacks the "launcher" key;
+    # Prompt resets it to the current completers instead of raising later.
+    history_dir = tmp_path / "qtile"
+    history_dir.mkdir(exist_ok=True)
+    plain = widgets.Prompt(record_history=True)
+    with open(history_dir / "prompt_history", "wb") as f:
+        pickle.dump(plain.history, f, protocol=2)
+
+    prompt = type(launcher_prompt)(record_history=True)
+    assert "launcher" in prompt.history